@@ -0,0 +1,308 @@
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ========================== Loading ==========================
+
+DELAY_LOG_SOURCE_FILES = ("L101.csv", "L102.csv", "DelayCodeInfo.csv")
+
+
+def read_from_file(folder_path: str):
+    """
+    Load L101.csv, L102.csv, and DelayCodeInfo.csv from the given folder.
+
+    Returns:
+        Tuple of (l101_df, l102_df, delay_code_info_df)
+    """
+    l101_path = os.path.join(folder_path, "L101.csv")
+    l102_path = os.path.join(folder_path, "L102.csv")
+    delay_code_path = os.path.join(folder_path, "DelayCodeInfo.csv")
+
+    l101_df = pd.read_csv(l101_path, parse_dates=['OperationDateTime'])
+    l102_df = pd.read_csv(l102_path)
+    delay_code_info_df = pd.read_csv(delay_code_path)
+
+    return l101_df, l102_df, delay_code_info_df
+
+def lookup_join(left: pd.DataFrame, right: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Left-join `right` onto `left` by `key` through integer codes instead of a hash merge.
+
+    The right table's keys become an index that each left row is looked up in,
+    giving the position of its match (-1 when missing), and every right column is
+    gathered with a single reindex. As in `pd.merge`, null keys match each
+    other: left rows with a null key take the right row with a null key.
+    Falls back to `pd.merge` when right keys (nulls included) are not unique,
+    since a row-multiplying join cannot be a plain lookup, and when the key
+    dtypes differ, so mismatched keys fail (or coerce) exactly as they do there.
+    """
+    if not right[key].is_unique or left[key].dtype != right[key].dtype:
+        return pd.merge(left, right, on=key, how='left')
+
+    codes = pd.Index(right[key]).get_indexer(left[key])
+    columns = {}
+    for col in right.columns.drop(key):
+        name = f"{col}_y" if col in left.columns else col
+        columns[name] = pd.Series(right[col].to_numpy()).reindex(codes).to_numpy()
+
+    overlap = {col: f"{col}_x" for col in left.columns if col != key and col in right.columns}
+    return pd.concat([left.rename(columns=overlap), pd.DataFrame(columns, index=left.index)], axis=1)
+
+def merge_data(l101_df: pd.DataFrame, l102_df: pd.DataFrame, delay_code_info_df: pd.DataFrame,
+               corridor=None, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Merge L101 and L102 tables on common keys (e.g., TripId), then attach DelayCode info.
+
+    The corridor and date filters (inclusive dates) are applied to L101 before
+    joining, so the join cost is paid only for the rows kept.
+
+    Returns:
+        Cleaned and merged DataFrame ready for delay analysis.
+    """
+    mask = np.ones(len(l101_df), dtype=bool)
+    if corridor is not None:
+        mask &= (l101_df.CorridorId == corridor).to_numpy()
+    if start_date is not None:
+        mask &= (l101_df.OperationDateTime >= pd.Timestamp(str(start_date))).to_numpy()
+    if end_date is not None:
+        mask &= (l101_df.OperationDateTime < pd.Timestamp(str(end_date)) + pd.Timedelta(days=1)).to_numpy()
+    merged = l101_df[mask].reset_index(drop=True)
+
+    # Attach L102 by 'TripId', then DelayCodeInfo as a lookup indexed by delay code
+    merged = lookup_join(merged, l102_df, 'TripId')
+    merged = lookup_join(merged, delay_code_info_df, 'DelayCode')
+
+    return merged
+
+# ========================== Delay Statistics ==========================
+
+DELAY_PERCENTILES = (50, 90, 99)
+
+def delay_log_keys(values: pd.Series) -> np.ndarray:
+    """
+    Convert delay-log key values (trip numbers, station codes) to strings.
+
+    Integral floats print without a decimal part, so trip 900 is '900' even
+    after a left join with unmatched rows has turned the column into float64.
+    Missing values stay None.
+    """
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype('Int64')
+    return np.where(values.isna(), None, values.astype(str).to_numpy(dtype=object))
+
+def delay_log_key(value):
+    """Scalar version of `delay_log_keys`: 900, 900.0 and '900' all become '900'; missing values None."""
+    if value is None or value != value:  # NaN
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class DelayStatistics:
+    """
+    Historical delay distributions per trip, station and hour of day.
+
+    All tables are built once with vectorized group operations. Each dimension
+    keeps its sorted keys, a (n_keys, len(DELAY_PERCENTILES)) float32 table of
+    delay-minute percentiles, the log count per key, and a (n_keys, n_codes)
+    int32 table of delay-code counts, so lookups are a dict hit plus row reads.
+
+    Column names are configurable because the delay-log schema varies between
+    exports (see `GoAPISimulator(delay_stat_columns=...)`); pass None for
+    trip_col, station_col, time_col or code_col to skip that dimension. A
+    column passed explicitly that the logs lack raises ValueError; a missing
+    default column is skipped with a warning, so an export without, say,
+    StationCode still gets trip and hour statistics.
+    """
+
+    DEFAULT_COLUMNS = {
+        'trip_col': 'TripNumber',
+        'station_col': 'StationCode',
+        'time_col': 'OperationDateTime',
+        'delay_col': 'DelayMinutes',
+        'code_col': 'DelayCode',
+    }
+
+    def __init__(self, delay_logs: pd.DataFrame, **columns):
+        unknown = set(columns) - set(self.DEFAULT_COLUMNS)
+        if unknown:
+            raise TypeError(f"Unknown DelayStatistics column argument(s): {', '.join(sorted(unknown))}.")
+        available = ', '.join(map(str, delay_logs.columns))
+        missing = [col for col in columns.values() if col is not None and col not in delay_logs]
+        if columns.get('delay_col', '') is None or missing:
+            raise ValueError(f"Delay logs lack column(s) {missing or [None]}; available: {available}.")
+
+        resolved = {**self.DEFAULT_COLUMNS, **columns}
+        for arg, col in self.DEFAULT_COLUMNS.items():
+            if arg not in columns and col not in delay_logs:
+                logger.warning("Delay logs lack default column %s; skipping it. Available: %s.", col, available)
+                resolved[arg] = None
+        trip_col, station_col, time_col = resolved['trip_col'], resolved['station_col'], resolved['time_col']
+        delay_col, code_col = resolved['delay_col'], resolved['code_col']
+
+        self.delay_codes = []
+        self.tables = {}
+        if delay_col is None:
+            return
+        logs = delay_logs[delay_logs[delay_col].notna()]
+        delays = pd.to_numeric(logs[delay_col], errors='coerce').to_numpy(dtype=np.float32)
+
+        if code_col is not None:
+            code_values = logs[code_col].astype('category')
+            self.delay_codes = code_values.cat.categories.tolist()
+            codes = code_values.cat.codes.to_numpy()
+        else:
+            codes = np.full(len(logs), -1, dtype=np.int8)
+
+        dimensions = {'trip': trip_col, 'station': station_col}
+        keys = {
+            name: delay_log_keys(logs[col]) for name, col in dimensions.items() if col is not None
+        }
+        if time_col is not None:
+            keys['hour'] = pd.to_datetime(logs[time_col]).dt.hour.to_numpy()
+
+        self.tables = {name: self._build_table(values, delays, codes) for name, values in keys.items()}
+
+    def _build_table(self, keys, delays, codes) -> dict:
+        """Group `delays` and `codes` by `keys` and compute percentiles and code counts per group."""
+        valid = ~np.isnan(delays) & pd.notna(keys)
+        keys, delays, codes = keys[valid], delays[valid], codes[valid]
+        uniques, inverse = np.unique(keys, return_inverse=True)
+
+        order = np.lexsort((delays, inverse))
+        sorted_delays = delays[order]
+        counts = np.bincount(inverse, minlength=len(uniques))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+        # Linear interpolation between order statistics, as np.percentile does
+        percentiles = np.empty((len(uniques), len(DELAY_PERCENTILES)), dtype=np.float32)
+        for j, q in enumerate(DELAY_PERCENTILES):
+            position = starts + (counts - 1) * (q / 100)
+            lo = np.floor(position).astype(np.int64)
+            hi = np.ceil(position).astype(np.int64)
+            percentiles[:, j] = sorted_delays[lo] + (sorted_delays[hi] - sorted_delays[lo]) * (position - lo)
+
+        code_counts = np.zeros((len(uniques), len(self.delay_codes)), dtype=np.int32)
+        has_code = codes >= 0
+        np.add.at(code_counts, (inverse[has_code], codes[has_code]), 1)
+
+        return {
+            'keys': uniques,
+            'rows': {key: i for i, key in enumerate(uniques.tolist())},
+            'percentiles': percentiles,
+            'counts': counts.astype(np.int32),
+            'code_counts': code_counts,
+        }
+
+    def lookup(self, dimension: str, key) -> dict:
+        """
+        Return the delay distribution for one trip number, station code or hour.
+
+        Returns:
+            Dictionary with count, p50/p90/p99 delay minutes and delay-code
+            frequencies, or None if the key has no history.
+        """
+        table = self.tables.get(dimension)
+        if table is None:
+            return None
+        row = table['rows'].get(int(key) if dimension == 'hour' else delay_log_key(key))
+        if row is None:
+            return None
+
+        count = int(table['counts'][row])
+        stats = {'count': count}
+        stats.update({f'p{q}': float(v) for q, v in zip(DELAY_PERCENTILES, table['percentiles'][row])})
+        stats['delay_codes'] = {
+            code: int(n) / count
+            for code, n in zip(self.delay_codes, table['code_counts'][row]) if n
+        }
+        return stats
+
+    def usual_delay(self, trip=None, station=None, hour=None):
+        """
+        Median delay in minutes for the most specific of trip, station or hour with history.
+
+        Returns None when none of them has been seen.
+        """
+        for dimension, key in (('trip', trip), ('station', station), ('hour', hour)):
+            if key is None:
+                continue
+            stats = self.lookup(dimension, key)
+            if stats is not None:
+                return stats['p50']
+        return None
+
+# ========================== Delay Log Index ==========================
+
+class DelayLogIndex:
+    """
+    Time-range index over delay logs sorted by OperationDateTime.
+
+    Timestamps are kept as an int64 nanosecond array so a window is two
+    `searchsorted` calls. Corridor, station and delay-code secondary indexes map
+    each value to the sorted row positions holding it; because rows are in time
+    order, those positions are time-ordered too and can be windowed the same way.
+    """
+
+    def __init__(self, delay_logs: pd.DataFrame, time_col='OperationDateTime', corridor_col='CorridorId',
+                 station_col='StationCode', code_col='DelayCode'):
+        self.timestamps = delay_logs[time_col].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        if len(self.timestamps) and np.any(np.diff(self.timestamps) < 0):
+            raise ValueError(f"Delay logs must be sorted by {time_col}.")
+
+        self.secondary = {}
+        for name, col in (('corridor', corridor_col), ('station', station_col), ('delay_code', code_col)):
+            if col not in delay_logs:
+                continue
+            values = delay_logs[col].astype('category')
+            codes = values.cat.codes.to_numpy()
+            order = np.argsort(codes, kind='stable').astype(np.int32)
+            bounds = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+            self.secondary[name] = {
+                value: order[bounds[i]:bounds[i + 1]]
+                for i, value in enumerate(values.cat.categories.tolist())
+            }
+
+    @staticmethod
+    def _to_ns(value) -> int:
+        return pd.Timestamp(value).value
+
+    def query(self, start=None, end=None, **filters) -> np.ndarray:
+        """
+        Return the time-ordered row positions of logs in [start, end) matching every filter.
+
+        Args:
+            start, end: window bounds (datetime, Timestamp or string); None is open.
+            **filters: corridor=, station= and/or delay_code= values to match.
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, self._to_ns(start), side='left'))
+        hi = len(self.timestamps) if end is None else int(np.searchsorted(self.timestamps, self._to_ns(end), side='left'))
+        if lo >= hi:
+            return np.empty(0, dtype=np.int32)
+
+        postings = []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in self.secondary:
+                raise KeyError(f"No {name} index on these delay logs.")
+            rows = self.secondary[name].get(value)
+            if rows is None:
+                return np.empty(0, dtype=np.int32)
+            postings.append(rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)])
+
+        if not postings:
+            return np.arange(lo, hi, dtype=np.int32)
+        postings.sort(key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            rows = rows[np.isin(rows, other, assume_unique=True)]
+        return rows
+
+    def __len__(self):
+        return len(self.timestamps)
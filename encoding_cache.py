@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ========================== Query Encoding Cache ==========================
+
+class EncodingCache:
+    """
+    Bounded LRU cache of query text -> embedding, optionally backed by SQLite.
+
+    Keys are whitespace-collapsed, lowercased queries. The on-disk store is
+    shared by every process pointing at the same file and survives restarts;
+    entries are namespaced by model name so switching models never returns
+    stale vectors. Hit/miss counters are exposed through `stats()`.
+    """
+
+    def __init__(self, encode_fn, maxsize=1024, path=None, namespace=""):
+        self.encode_fn = encode_fn
+        self.maxsize = maxsize
+        self.namespace = namespace
+        self.entries = OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+        self.lock = threading.Lock()
+
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS encodings ("
+                "namespace TEXT, query TEXT, dim INTEGER, vector BLOB, PRIMARY KEY (namespace, query))"
+            )
+            self.db.commit()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Return the cache key for a query: whitespace-collapsed and lowercased."""
+        return " ".join(str(text).split()).lower()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self.entries[key] = vector
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _load(self, key: str):
+        row = self.db.execute(
+            "SELECT vector FROM encodings WHERE namespace = ? AND query = ?", (self.namespace, key)
+        ).fetchone()
+        return None if row is None else np.frombuffer(row[0], dtype=np.float32)
+
+    def _store(self, key: str, vector: np.ndarray) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO encodings VALUES (?, ?, ?, ?)",
+            (self.namespace, key, len(vector), vector.tobytes()),
+        )
+        self.db.commit()
+
+    def encode(self, text: str) -> np.ndarray:
+        """Return the embedding for `text`, computing and caching it on a miss."""
+        key = self.normalize(text)
+        with self.lock:
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return vector
+            if self.db is not None:
+                vector = self._load(key)
+                if vector is not None:
+                    self.disk_hits += 1
+                    self._remember(key, vector)
+                    return vector
+
+        vector = np.asarray(self.encode_fn(text), dtype=np.float32).ravel()
+        with self.lock:
+            self.misses += 1
+            self._remember(key, vector)
+            if self.db is not None:
+                self._store(key, vector)
+        return vector
+
+    def encode_many(self, texts: list) -> np.ndarray:
+        """
+        Return a (len(texts), dim) matrix of embeddings.
+
+        Cached queries are served from memory or disk; all remaining distinct
+        queries are encoded together in a single batched call.
+        """
+        keys = [self.normalize(text) for text in texts]
+        found, missing = {}, {}
+        with self.lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vector = self.entries.get(key)
+                if vector is not None:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                elif self.db is not None:
+                    vector = self._load(key)
+                    if vector is not None:
+                        self.disk_hits += 1
+                        self._remember(key, vector)
+                if vector is None:
+                    missing[key] = text
+                else:
+                    found[key] = vector
+
+        if missing:
+            vectors = np.asarray(self.encode_fn(list(missing.values())), dtype=np.float32)
+            vectors = vectors.reshape(len(missing), -1)
+            with self.lock:
+                for key, vector in zip(missing, vectors):
+                    self.misses += 1
+                    found[key] = vector
+                    self._remember(key, vector)
+                    if self.db is not None:
+                        self._store(key, vector)
+
+        return np.stack([found[key] for key in keys])
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size, for sizing the cache."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self) -> None:
+        """Drop in-memory entries and reset counters; the on-disk store is kept."""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+
+# ========================== Spatial Index ==========================
+
+EARTH_RADIUS_KM = 6371.0
+DISTANCE_CHUNK_ROWS = 2048
+
+
+def haversine_km(lat, lon, lats, lons, dtype=np.float64) -> np.ndarray:
+    """
+    Great-circle distance (km) from one point to many.
+
+    Args:
+        lat, lon: origin point in degrees.
+        lats, lons: array-likes of destination coordinates in degrees.
+        dtype: np.float64, or np.float32 to halve memory at ~1 m precision.
+
+    Returns:
+        Array of distances with the shape of `lats`.
+    """
+    lat, lon = np.radians(np.asarray(lat, dtype=dtype)), np.radians(np.asarray(lon, dtype=dtype))
+    lats, lons = np.radians(np.asarray(lats, dtype=dtype)), np.radians(np.asarray(lons, dtype=dtype))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))).astype(dtype, copy=False)
+
+def haversine_matrix(lats1, lons1, lats2=None, lons2=None, dtype=np.float64,
+                     chunk_rows=DISTANCE_CHUNK_ROWS) -> np.ndarray:
+    """
+    Great-circle distance matrix (km) between two sets of points.
+
+    Rows are filled `chunk_rows` at a time so the trigonometric temporaries
+    stay bounded at chunk_rows x len(lats2) however large the first set is.
+
+    Args:
+        lats1, lons1: coordinates of the row points in degrees.
+        lats2, lons2: coordinates of the column points; defaults to the row points.
+        dtype: np.float64, or np.float32 for large matrices.
+
+    Returns:
+        Array of shape (len(lats1), len(lats2)).
+    """
+    if lats2 is None:
+        lats2, lons2 = lats1, lons1
+    lat1, lon1 = np.radians(np.asarray(lats1, dtype=dtype)), np.radians(np.asarray(lons1, dtype=dtype))
+    lat2, lon2 = np.radians(np.asarray(lats2, dtype=dtype)), np.radians(np.asarray(lons2, dtype=dtype))
+    cos2 = np.cos(lat2)
+
+    out = np.empty((len(lat1), len(lat2)), dtype=dtype)
+    for start in range(0, len(lat1), max(int(chunk_rows), 1)):
+        rows = slice(start, start + chunk_rows)
+        la, lo = lat1[rows, None], lon1[rows, None]
+        a = np.sin((lat2 - la) / 2) ** 2 + np.cos(la) * cos2 * np.sin((lon2 - lo) / 2) ** 2
+        out[rows] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return out
+
+def segment_lengths_km(path) -> np.ndarray:
+    """Length (km) of each segment between consecutive (lat, lon) points of a polyline."""
+    coords = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 2:
+        return np.empty(0, dtype=np.float64)
+    lat, lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def path_length_km(path) -> float:
+    """Length (km) of a polyline given as a sequence of (lat, lon) points."""
+    return float(segment_lengths_km(path).sum())
+
+
+class StopSpatialIndex:
+    """
+    BallTree over stop coordinates using the haversine metric.
+
+    Built once at load time; nearest-neighbour and radius queries are
+    O(log n) tree walks instead of a haversine per stop.
+    """
+
+    def __init__(self, stops: pd.DataFrame):
+        coords = stops[['stop_lat', 'stop_lon']].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(coords).any(axis=1)
+        self.stop_ids = stops.stop_id.to_numpy()[valid]
+        self.stop_names = stops.stop_name.to_numpy()[valid]
+        self.tree = BallTree(np.radians(coords[valid]), metric='haversine')
+
+    def _records(self, indices, distances) -> list:
+        return [
+            {
+                'stop_id': self.stop_ids[i],
+                'stop_name': self.stop_names[i],
+                'distance_km': float(d * EARTH_RADIUS_KM),
+            }
+            for i, d in zip(indices, distances)
+        ]
+
+    def nearest(self, lat: float, lon: float, k=1) -> list:
+        """Return the `k` stops closest to (lat, lon), nearest first."""
+        k = min(k, len(self.stop_ids))
+        if k == 0:
+            return []
+        distances, indices = self.tree.query(np.radians([[lat, lon]]), k=k)
+        return self._records(indices[0], distances[0])
+
+    def within(self, lat: float, lon: float, radius_km: float) -> list:
+        """Return all stops within `radius_km` of (lat, lon), nearest first."""
+        indices, distances = self.tree.query_radius(
+            np.radians([[lat, lon]]), r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+        )
+        return self._records(indices[0], distances[0])
@@ -0,0 +1,310 @@
+import re
+import json
+import time
+import random
+import argparse
+import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from delay_logs import delay_log_keys
+from go_api_simu import GoAPISimulator, gtfs_time_to_seconds
+
+
+# ========================== OpenData Emulator ==========================
+
+class OpenDataEmulator:
+    """
+    Answer Metrolinx OpenData API paths from `GoAPISimulator` data.
+
+    Paths are matched after their `api/V1/` prefix, so `GoTrainAPI` and the
+    GTFS-RT tools in tools.py work unchanged once their base URL points here.
+    Payloads follow the OpenData layout (a `Metadata` block plus the resource)
+    for the fields this project reads; unsupported resources answer 404.
+
+    The simulated clock runs at wall-clock speed from `clock` (default: the
+    simulator's `start_date` at the current time of day). Alerts and trip
+    updates are the delay logs of the last `alert_window_minutes`.
+    """
+
+    def __init__(self, simulator: GoAPISimulator, clock: datetime.datetime = None, alert_window_minutes=60):
+        self.simulator = simulator
+        if clock is None:
+            date = str(simulator.start_date)
+            clock = datetime.datetime.combine(
+                datetime.date(int(date[:4]), int(date[4:6]), int(date[6:8])), datetime.datetime.now().time()
+            )
+        self.clock_offset = clock - datetime.datetime.now()
+        self.alert_window = datetime.timedelta(minutes=alert_window_minutes)
+
+        self.routes = [
+            (re.compile(pattern), handler) for pattern, handler in (
+                (r"Stop/All", self.all_stops),
+                (r"Stop/Details/(\w+)", self.stop_details),
+                (r"Stop/NextService/(\w+)", self.next_service),
+                (r"Schedule/Journey/(\d{8})/(\w+)/(\w+)/(\d{1,2}:?\d{2})/(\d+)", self.journey_schedule),
+                (r"Schedule/Trip/(\d{8})/(\w+)", self.trip_schedule),
+                (r"ServiceUpdate/ServiceAlert/All", self.service_alerts),
+                (r"ServiceUpdate/(?:InformationAlert|MarketingAlert)/All", self.empty_messages),
+                (r"ServiceUpdate/UnionDepartures/All", self.union_departures),
+                (r"ServiceUpdate/Exceptions/(?:Train|Bus|All)", self.exceptions),
+                (r"Fleet/Occupancy/GtfsRT/Feed/Alerts", self.gtfs_rt_alerts),
+                (r"Fleet/Occupancy/GtfsRT/Feed/TripUpdates", self.gtfs_rt_trip_updates),
+            )
+        ]
+
+    def now(self) -> datetime.datetime:
+        """Return the current simulated time."""
+        return datetime.datetime.now() + self.clock_offset
+
+    def handle(self, path: str):
+        """
+        Route one request path.
+
+        Returns:
+            Tuple of (HTTP status, JSON-serializable payload).
+        """
+        match = re.search(r"api/V1/(.+?)/?$", urlsplit(path).path)
+        if match:
+            for pattern, handler in self.routes:
+                args = pattern.fullmatch(match.group(1))
+                if args:
+                    return 200, handler(*args.groups())
+        return 404, self.metadata(404, "Resource not emulated")
+
+    # ========================== Payload Helpers ==========================
+
+    def metadata(self, code=200, message="OK") -> dict:
+        return {"Metadata": {
+            "TimeStamp": self.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ErrorCode": str(code),
+            "ErrorMessage": message,
+        }}
+
+    def service_time(self, date: int, gtfs_time: str) -> str:
+        """Format a GTFS service-day time (hours may pass 24) as an OpenData "YYYY-MM-DD HH:MM:SS" timestamp."""
+        day = datetime.datetime.strptime(str(date), "%Y%m%d")
+        return (day + datetime.timedelta(seconds=int(gtfs_time_to_seconds([gtfs_time])[0]))).strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def trip_number(trip_id: str) -> str:
+        return trip_id.rsplit('-', 1)[-1]
+
+    @staticmethod
+    def line_code(trip_id: str) -> str:
+        return trip_id.split('-')[1] if trip_id.count('-') >= 2 else ""
+
+    def recent_delay_logs(self) -> pd.DataFrame:
+        """Delay logs of the last `alert_window_minutes`, with trip numbers as integer strings ('900', not '900.0')."""
+        now = self.now()
+        logs = self.simulator.get_delay_logs(now - self.alert_window, now)
+        if 'TripNumber' in logs:
+            logs = logs.assign(TripNumber=delay_log_keys(logs.TripNumber))
+        return logs
+
+    # ========================== Stops ==========================
+
+    def all_stops(self) -> dict:
+        stops = self.simulator.stops
+        return {**self.metadata(), "Stations": {"Station": [
+            {"LocationCode": code, "LocationName": name, "LocationType": "Train Station"}
+            for code, name in zip(stops.stop_id.tolist(), stops.stop_name.tolist())
+        ]}}
+
+    def stop_details(self, stop_code: str) -> dict:
+        stop = self.simulator.stops[self.simulator.stops.stop_id == stop_code]
+        if stop.empty:
+            return {**self.metadata(204, "No stop found"), "Stop": None}
+        row = stop.iloc[0]
+        return {**self.metadata(), "Stop": {
+            "Code": stop_code,
+            "StopName": row.stop_name,
+            "Latitude": float(row.stop_lat),
+            "Longitude": float(row.stop_lon),
+        }}
+
+    def next_service(self, stop_code: str) -> dict:
+        now = self.now()
+        date = int(now.strftime("%Y%m%d"))
+        lines = []
+        for departure in self.simulator.get_stop_departures(stop_code, now.time(), date, n=10):
+            trip_id = departure['trip_id']
+            scheduled = self.service_time(date, departure['departure_time'])
+            delay = self.simulator.usual_delay(trip_id, stop_code, gtfs_time_to_seconds([departure['departure_time']])[0])
+            computed = pd.Timestamp(scheduled) + pd.Timedelta(minutes=delay or 0)
+            lines.append({
+                "StopCode": stop_code,
+                "LineCode": self.line_code(trip_id),
+                "DirectionName": departure['stop_headsign'],
+                "ScheduledDepartureTime": scheduled,
+                "ComputedDepartureTime": computed.strftime("%Y-%m-%d %H:%M:%S"),
+                "DepartureStatus": "S" if not delay else "D",
+                "TripNumber": self.trip_number(trip_id),
+                "ServiceType": "T",
+            })
+        return {**self.metadata(), "NextService": {"Lines": lines}}
+
+    # ========================== Schedules ==========================
+
+    def journey_schedule(self, date, from_stop, to_stop, start_time, max_journey) -> dict:
+        start_time = start_time if ":" in start_time else f"{start_time[:-2]}:{start_time[-2:]}"
+        trips = self.simulator.get_next_available_trips(
+            from_stop, to_stop, time=start_time, date=int(date), n=int(max_journey)
+        )
+        services = [{
+            "Type": "T",
+            "StartTime": self.service_time(date, trip['departure_time']),
+            "EndTime": self.service_time(date, trip['arrival_time']),
+            "Trips": {"Trip": [{
+                "Number": self.trip_number(trip['trip_id']),
+                "Line": self.line_code(trip['trip_id']),
+                "Display": f"{trip['origin']} - {trip['destination']}",
+            }]},
+        } for trip in trips]
+        return {**self.metadata(200 if services else 204), "SchedJourneys": [{
+            "Date": date, "Time": start_time, "From": from_stop, "To": to_stop, "Services": services,
+        }]}
+
+    def trip_schedule(self, date, trip_number) -> dict:
+        for corridor in self.simulator.corridors:
+            try:
+                info = self.simulator.get_trip_info(trip_number, date=date, corridor=corridor)
+            except ValueError:
+                continue
+            return {**self.metadata(), "Trips": {"Trip": [{
+                "Number": trip_number,
+                "Line": corridor,
+                "Display": info['stop_headsign'],
+                "Stops": {"Stop": [
+                    {"Name": stop['stop_name'], "Time": stop['departure_time']} for stop in info['stop_sequence']
+                ]},
+            }]}}
+        return {**self.metadata(204, "No trip found"), "Trips": {"Trip": []}}
+
+    # ========================== Service Updates ==========================
+
+    def service_alerts(self) -> dict:
+        logs = self.recent_delay_logs()
+        messages = [{
+            "Code": str(log.get('DelayCode')),
+            "Category": "Delay",
+            "SubjectEnglish": f"Trip {log.get('TripNumber')} delayed",
+            "BodyEnglish": f"{log.get('DelayDescription', log.get('DelayCode'))} at {log.get('StationCode')}",
+            "PostedDateTime": str(log.get('OperationDateTime')),
+            "Stops": {"Stop": [{"Code": log.get('StationCode')}]},
+        } for log in logs.to_dict(orient='records')]
+        return {**self.metadata(), "Messages": {"Message": messages}}
+
+    def empty_messages(self) -> dict:
+        return {**self.metadata(), "Messages": {"Message": []}}
+
+    def union_departures(self) -> dict:
+        now = self.now()
+        date = int(now.strftime("%Y%m%d"))
+        trips = [{
+            "TripNumber": self.trip_number(departure['trip_id']),
+            "Service": departure['stop_headsign'],
+            "Platform": "-",
+            "Time": self.service_time(date, departure['departure_time']),
+        } for departure in self.simulator.get_stop_departures("UN", now.time(), date, n=20)]
+        return {**self.metadata(), "AllDepartures": {"Trip": trips}}
+
+    def exceptions(self) -> dict:
+        return {**self.metadata(), "Trip": []}
+
+    # ========================== GTFS-RT ==========================
+
+    def gtfs_rt_header(self) -> dict:
+        return {"gtfs_realtime_version": "2.0", "incrementality": "FULL_DATASET",
+                "timestamp": int(self.now().timestamp())}
+
+    def gtfs_rt_alerts(self) -> dict:
+        entities = [{
+            "id": f"alert-{i}",
+            "alert": {
+                "header_text": {"translation": [{"text": f"Trip {log.get('TripNumber')} delayed", "language": "en"}]},
+                "description_text": {"translation": [
+                    {"text": str(log.get('DelayDescription', log.get('DelayCode'))), "language": "en"}
+                ]},
+                "informed_entity": [{"stop_id": log.get('StationCode')}],
+            },
+        } for i, log in enumerate(self.recent_delay_logs().to_dict(orient='records'))]
+        return {"header": self.gtfs_rt_header(), "entity": entities}
+
+    def gtfs_rt_trip_updates(self) -> dict:
+        entities = [{
+            "id": f"trip-update-{i}",
+            "trip_update": {
+                "trip": {
+                    "trip_id": f"{log['OperationDateTime']:%Y%m%d}-{log.get('CorridorId')}-{log.get('TripNumber')}",
+                    "start_date": f"{log['OperationDateTime']:%Y%m%d}",
+                },
+                "delay": int(log['DelayMinutes']) * 60 if pd.notna(log.get('DelayMinutes')) else 0,
+                "stop_time_update": [{"stop_id": log.get('StationCode')}],
+            },
+        } for i, log in enumerate(self.recent_delay_logs().to_dict(orient='records'))]
+        return {"header": self.gtfs_rt_header(), "entity": entities}
+
+# ========================== HTTP Server ==========================
+
+def make_server(emulator: OpenDataEmulator, host="127.0.0.1", port=8765, latency=0.0, jitter=0.0,
+                error_rate=0.0, error_statuses=(500, 503), seed=None) -> ThreadingHTTPServer:
+    """
+    Create a threaded HTTP server in front of `emulator`.
+
+    Args:
+        latency: fixed delay in seconds added to every response.
+        jitter: extra uniform random delay in [0, jitter] seconds.
+        error_rate: fraction of requests answered with one of `error_statuses`.
+        seed: random seed for reproducible latency and error injection.
+    """
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            delay = latency + (rng.uniform(0, jitter) if jitter else 0.0)
+            if delay:
+                time.sleep(delay)
+
+            if error_rate and rng.random() < error_rate:
+                status = rng.choice(error_statuses)
+                payload = emulator.metadata(status, "Injected error")
+            else:
+                try:
+                    status, payload = emulator.handle(self.path)
+                except Exception as exc:
+                    status, payload = 500, emulator.metadata(500, str(exc))
+
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+# ========================== Main ==========================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve GoAPISimulator data on Metrolinx OpenData API paths.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default="Data/gtfs-2018")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixed response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = make_server(
+        OpenDataEmulator(GoAPISimulator(data_dir=args.data_dir)),
+        args.host, args.port, args.latency, args.jitter, args.error_rate, seed=args.seed,
+    )
+    print(f"Serving on http://{args.host}:{args.port}/OpenDataAPI/ (set GO_API_BASE_URL to use it)")
+    server.serve_forever()
@@ -1,142 +1,1479 @@
 import os
+import re
 import ast
+import hashlib
+import functools
 import datetime
+import asyncio
+import logging
+import threading
+from time import monotonic, perf_counter, sleep
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
-from math import radians, sin, cos, sqrt, atan2
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
 
+from delay_logs import (
+    DELAY_LOG_SOURCE_FILES, DelayLogIndex, DelayStatistics, merge_data, read_from_file,
+)
+from encoding_cache import EncodingCache
+from geo import StopSpatialIndex, haversine_km, haversine_matrix
+from journey_planner import ConnectionScanPlanner
+from shapes import ShapeIndex
+from snapshots import (
+    arrays_digest, embeddings_path, feed_fingerprint, frames_digest, load_snapshot, normalize_rows,
+    prune_snapshots, save_matrix, save_snapshot, snapshot_path,
+)
+from stop_resolver import StopNameResolver
 
-# ========================== Tools ==========================
+logger = logging.getLogger(__name__)
 
-def read_from_file(folder_path: str):
+
+# ========================== Time Encoding ==========================
+
+def gtfs_time_to_seconds(values) -> np.ndarray:
+    """
+    Convert GTFS "HH:MM:SS" strings to seconds since the start of the service day.
+
+    Hours past 24 (trips running after midnight) are kept as-is, e.g. "25:10:00"
+    becomes 90600. Missing or malformed values become -1.
+    """
+    hms = (
+        pd.Series(values, dtype=object).astype("string")
+        .str.extract(r"^\s*(\d+):(\d{2})(?::(\d{2}))?\s*$")
+        .astype("float64")
+    )
+    seconds = hms[0] * 3600 + hms[1] * 60 + hms[2].fillna(0)
+    return seconds.fillna(-1).to_numpy(dtype=np.int64)
+
+@functools.lru_cache(maxsize=1 << 18)
+def seconds_to_gtfs_time(seconds: int) -> str:
+    """Format seconds since the start of the service day as a GTFS "HH:MM:SS" string (None if missing)."""
+    seconds = int(seconds)
+    if seconds < 0:
+        return None
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def parse_time_of_day(value=None) -> int:
+    """
+    Return a query time as seconds since midnight.
+
+    Accepts None (now), a datetime/time object, or a "HH:MM[:SS]" string.
+    """
+    if value is None:
+        value = datetime.datetime.now()
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    match = re.match(r"^\s*(\d+):(\d{2})(?::(\d{2}))?\s*$", str(value))
+    if match is None:
+        raise ValueError(f"Unrecognized time: {value!r}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds or 0)
+
+# ========================== Embedding Model ==========================
+
+DEFAULT_EMBEDDING_MODEL = 'sentence-transformers/all-roberta-large-v1'
+
+
+def load_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL, backend=None, quantize=False):
+    """
+    Load a SentenceTransformer for CPU inference.
+
+    Args:
+        model_name: any sentence-transformers model name or local path.
+        backend: None/'torch', or 'onnx' / 'openvino' for an exported runtime.
+        quantize: apply dynamic int8 quantization to the Linear layers (torch only).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    kwargs = {'backend': backend} if backend not in (None, 'torch') else {}
+    model = SentenceTransformer(model_name, **kwargs)
+
+    if quantize:
+        if kwargs:
+            raise ValueError("quantize is only supported with the torch backend")
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def embedding_variant(model_name=DEFAULT_EMBEDDING_MODEL, backend=None, quantize=False):
+    """
+    Return a short key for a non-default embedding configuration, or None for the default.
+
+    The precomputed embeddings in stops.csv only match the default model.
+    """
+    if model_name == DEFAULT_EMBEDDING_MODEL and backend in (None, 'torch') and not quantize:
+        return None
+    config = f"{model_name}|{backend or 'torch'}|{'int8' if quantize else 'fp32'}"
+    return hashlib.sha1(config.encode()).hexdigest()[:8]
+
+# ========================== Service Calendar ==========================
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def yyyymmdd_to_date64(values) -> np.ndarray:
+    """Convert YYYYMMDD integers (or strings) to numpy datetime64[D]."""
+    return pd.to_datetime(pd.Series(values).astype(str), format="%Y%m%d").to_numpy(dtype='datetime64[D]')
+
+def date64_to_yyyymmdd(values) -> np.ndarray:
+    """Convert numpy datetime64[D] values to YYYYMMDD int32."""
+    days = pd.DatetimeIndex(np.asarray(values, dtype='datetime64[D]'))
+    return (days.year * 10000 + days.month * 100 + days.day).to_numpy(dtype=np.int32)
+
+class ServiceCalendar:
+    """
+    Date -> active service_id index built from calendar.txt and calendar_dates.txt.
+
+    Every date the feed covers is one row of a (n_dates, n_services) boolean
+    matrix, so a date's active services are a dict hit plus one row; weekly
+    patterns and added/removed exception dates are resolved once at load time.
+    """
+
+    def __init__(self, dates: np.ndarray, service_ids: np.ndarray, active: np.ndarray):
+        self.dates = np.asarray(dates, dtype=np.int32)
+        self.service_ids = np.asarray(service_ids)
+        self.active = np.asarray(active, dtype=bool)
+        self.rows = {date: row for row, date in enumerate(self.dates.tolist())}
+        self._services = {}
+
+    @classmethod
+    def from_feed(cls, data_dir: str) -> 'ServiceCalendar':
+        """Build the calendar from `data_dir`; calendar.txt is optional, calendar_dates.txt may add or remove dates."""
+        calendar_path = os.path.join(data_dir, "calendar.txt")
+        calendar = (
+            pd.read_csv(calendar_path, dtype={'service_id': str}) if os.path.exists(calendar_path)
+            else pd.DataFrame({'service_id': pd.Series(dtype=str), 'start_date': [], 'end_date': []})
+        )
+        exceptions = pd.read_csv(os.path.join(data_dir, "calendar_dates.txt"), dtype={'service_id': str})
+
+        starts = yyyymmdd_to_date64(calendar.start_date.astype('int64'))
+        ends = yyyymmdd_to_date64(calendar.end_date.astype('int64'))
+        exception_dates = yyyymmdd_to_date64(exceptions.date)
+        bounds = np.concatenate([starts, ends, exception_dates])
+        if not len(bounds):
+            return cls(np.empty(0, dtype=np.int32), np.empty(0, dtype=str), np.zeros((0, 0), dtype=bool))
+
+        days = np.arange(bounds.min(), bounds.max() + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+        service_ids = np.array(sorted(set(calendar.service_id) | set(exceptions.service_id)), dtype=str)
+        columns = {service_id: i for i, service_id in enumerate(service_ids.tolist())}
+        active = np.zeros((len(days), len(service_ids)), dtype=bool)
+
+        # Weekly patterns: Monday is weekday 0, and 1970-01-01 was a Thursday (3)
+        weekday = (days.astype(np.int64) + 3) % 7
+        for i, row in enumerate(calendar.itertuples(index=False)):
+            runs = np.array([getattr(row, name) == 1 for name in WEEKDAYS])
+            in_range = (days >= starts[i]) & (days <= ends[i])
+            active[in_range & runs[weekday], columns[row.service_id]] = True
+
+        # Exceptions: 1 adds the service on that date, 2 removes it
+        rows = (exception_dates - days[0]).astype(np.int64)
+        cols = exceptions.service_id.map(columns).to_numpy()
+        added = exceptions.exception_type.to_numpy() == 1
+        active[rows[added], cols[added]] = True
+        active[rows[~added], cols[~added]] = False
+
+        return cls(date64_to_yyyymmdd(days), service_ids, active)
+
+    def to_arrays(self) -> dict:
+        """Return the calendar as arrays for `save_snapshot` (rebuilt by `from_arrays`)."""
+        return {'dates': self.dates, 'service_ids': self.service_ids, 'active': self.active}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> 'ServiceCalendar':
+        return cls(arrays['dates'], arrays['service_ids'], arrays['active'])
+
+    def services_on(self, date) -> tuple:
+        """Return the service_ids active on `date` (YYYYMMDD), empty outside the calendar."""
+        date = int(date)
+        services = self._services.get(date)
+        if services is None:
+            row = self.rows.get(date)
+            services = () if row is None else tuple(self.service_ids[self.active[row]].tolist())
+            self._services[date] = services
+        return services
+
+    def __contains__(self, date) -> bool:
+        return int(date) in self.rows
+
+# ========================== GTFS Loading ==========================
+
+STOP_TIME_DTYPES = {
+    'trip_id': str,
+    'arrival_time': str,
+    'departure_time': str,
+    'stop_id': str,
+    'stop_sequence': np.int32,
+    'stop_headsign': str,
+}
+
+
+def read_stop_times(path: str, trip_ids, chunksize=500_000) -> pd.DataFrame:
+    """
+    Stream stop_times.txt in chunks, keeping only rows whose trip_id is in `trip_ids`.
+
+    Only the columns in STOP_TIME_DTYPES are parsed, with explicit dtypes, and
+    each chunk is filtered before the next is read, so peak memory is bounded
+    by the filtered result plus one chunk rather than by the whole feed.
     """
-    Load L101.csv, L102.csv, and DelayCodeInfo.csv from the given folder.
+    trip_ids = set(trip_ids)
+    # Dates with no active service (e.g. the day before the feed starts) skip the scan
+    chunks = [] if not trip_ids else [
+        chunk[chunk.trip_id.isin(trip_ids)]
+        for chunk in pd.read_csv(
+            path,
+            usecols=lambda col: col in STOP_TIME_DTYPES,
+            dtype=STOP_TIME_DTYPES,
+            chunksize=chunksize,
+        )
+    ]
+    if not chunks:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in STOP_TIME_DTYPES.items()})
+    return pd.concat(chunks, ignore_index=True)
+
+def trip_corridors(trips: pd.DataFrame) -> pd.Series:
+    """Return the corridor code of each trip, i.e. the route_id suffix after the last "-" (e.g. "LE")."""
+    return trips.route_id.astype(str).str.rsplit('-', n=1).str[-1]
+
+def drop_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove categories no longer referenced after filtering a frame of categoricals."""
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+def load_service_day(data_dir: str, service_date: int, service_ids=None, chunksize=500_000) -> dict:
+    """
+    Load every trip running on one service date, split by corridor.
+
+    A trip runs when its service_id is in `service_ids`, the services active on
+    the date (looked up in the feed's `ServiceCalendar` when not given).
+    stop_times.txt is streamed once for the whole day, so all corridors of a
+    date are built together.
 
     Returns:
-        Tuple of (l101_df, l102_df, delay_code_info_df)
+        Dict of corridor -> {'trips': DataFrame, 'stop_times': DataFrame}.
     """
-    l101_path = os.path.join(folder_path, "L101.csv")
-    l102_path = os.path.join(folder_path, "L102.csv")
-    delay_code_path = os.path.join(folder_path, "DelayCodeInfo.csv")
+    if service_ids is None:
+        service_ids = ServiceCalendar.from_feed(data_dir).services_on(service_date)
+    trips = pd.read_csv(
+        os.path.join(data_dir, "trips.txt"), dtype={'trip_id': str, 'route_id': str, 'service_id': str}
+    )
+    day_trips = trips[trips.service_id.isin(service_ids)].reset_index(drop=True)
+    day_trips['corridor'] = trip_corridors(day_trips)
 
-    l101_df = pd.read_csv(l101_path, parse_dates=['OperationDateTime'])
-    l102_df = pd.read_csv(l102_path)
-    delay_code_info_df = pd.read_csv(delay_code_path)
+    # Stream stop times with the trip filter pushed down into each chunk
+    stop_times = encode_stop_times(read_stop_times(
+        os.path.join(data_dir, "stop_times.txt"), day_trips.trip_id.unique(), chunksize=chunksize
+    ))
 
-    return l101_df, l102_df, delay_code_info_df
+    partitions = {}
+    for corridor, corridor_trips in day_trips.groupby('corridor', sort=False):
+        corridor_stop_times = stop_times[stop_times.trip_id.isin(corridor_trips.trip_id)].reset_index(drop=True)
+        partitions[corridor] = {
+            'trips': corridor_trips.reset_index(drop=True),
+            'stop_times': drop_unused_categories(corridor_stop_times),
+        }
+    partitions[None] = {'trips': day_trips.iloc[0:0], 'stop_times': stop_times.iloc[0:0]}
+    return partitions
+
+def encode_stop_times(stop_times: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert parsed stop times to the compact in-memory representation.
+
+    trip_id, stop_id and stop_headsign become categoricals, arrival_time and
+    departure_time become int32 seconds since the start of the service day
+    (see `gtfs_time_to_seconds`), and stop_sequence becomes int16 when it fits.
+    """
+    sequence = stop_times.stop_sequence
+    fits_int16 = sequence.empty or sequence.max() <= np.iinfo(np.int16).max
+
+    encoded = pd.DataFrame({
+        'trip_id': stop_times.trip_id.astype('category'),
+        'arrival_time': gtfs_time_to_seconds(stop_times.arrival_time).astype(np.int32),
+        'departure_time': gtfs_time_to_seconds(stop_times.departure_time).astype(np.int32),
+        'stop_id': stop_times.stop_id.astype('category'),
+        'stop_sequence': sequence.astype(np.int16 if fits_int16 else np.int32),
+    })
+    if 'stop_headsign' in stop_times:
+        encoded['stop_headsign'] = stop_times.stop_headsign.astype('category')
+    return encoded
+
+# ========================== Trip Index ==========================
+
+class TripIndex:
+    """
+    Integer-coded stop times sorted by (trip_id, stop_sequence).
 
-def merge_data(l101_df: pd.DataFrame, l102_df: pd.DataFrame, delay_code_info_df: pd.DataFrame) -> pd.DataFrame:
+    Each trip occupies one contiguous slice of the row arrays, so a trip
+    lookup is a dict hit plus a slice instead of a scan over all stop times.
+    Stops are coded by their position in the stops table (names pre-joined
+    through `stop_names`), trips by their ordinal in `trip_ids`, and times are
+    int32 seconds since the start of the service day.
     """
-    Merge L101 and L102 tables on common keys (e.g., TripId), then attach DelayCode info.
+
+    ARRAYS = ('starts', 'ends', 'row_trip', 'stop_codes', 'stop_sequence', 'arrival_seconds', 'departure_seconds')
+
+    def __init__(self, stop_times: pd.DataFrame, stops: pd.DataFrame):
+        self._index_stops(stops)
+
+        df = stop_times.assign(stop_code=stop_times.stop_id.astype(object).map(self.stop_codes_by_id))
+        df = (
+            df[df.stop_code.notna()]
+            .sort_values(['trip_id', 'stop_sequence'], kind='stable')
+            .drop_duplicates(['trip_id', 'stop_sequence'])
+        )
+
+        row_trip_ids = df.trip_id.astype(object).to_numpy()
+        boundaries = np.flatnonzero(row_trip_ids[1:] != row_trip_ids[:-1]) + 1
+        self.starts = np.r_[0, boundaries].astype(np.int64) if len(df) else np.empty(0, dtype=np.int64)
+        self.ends = np.r_[boundaries, len(df)].astype(np.int64) if len(df) else np.empty(0, dtype=np.int64)
+
+        self.trip_ids = row_trip_ids[self.starts]
+        self.slices = dict(zip(self.trip_ids.tolist(), zip(self.starts.tolist(), self.ends.tolist())))
+        self.row_trip = np.repeat(np.arange(len(self.starts), dtype=np.int32), self.ends - self.starts)
+        self.headsigns = (
+            df.stop_headsign.astype(object).to_numpy()[self.starts]
+            if 'stop_headsign' in df else np.full(len(self.starts), None, dtype=object)
+        )
+
+        self.stop_codes = df.stop_code.to_numpy(dtype=np.int32)
+        self.stop_sequence = df.stop_sequence.to_numpy()
+        self.arrival_seconds = df.arrival_time.to_numpy(dtype=np.int32)
+        self.departure_seconds = df.departure_time.to_numpy(dtype=np.int32)
+
+    def _index_stops(self, stops: pd.DataFrame) -> None:
+        stops = stops.drop_duplicates('stop_id')
+        self.stop_ids = stops.stop_id.to_numpy()
+        self.stop_names = stops.stop_name.to_numpy()
+        self.stop_coords = stops[['stop_lat', 'stop_lon']].to_numpy()
+        self.stop_codes_by_id = {stop_id: code for code, stop_id in enumerate(self.stop_ids.tolist())}
+
+    def to_arrays(self) -> dict:
+        """Return the index as plain numeric/unicode arrays for `save_snapshot` (rebuilt by `from_arrays`)."""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays['trip_ids'] = self.trip_ids.astype(str)
+        arrays['headsigns@na'] = pd.isna(self.headsigns).astype(bool)
+        arrays['headsigns'] = np.where(arrays['headsigns@na'], '', self.headsigns).astype(str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, stops: pd.DataFrame) -> 'TripIndex':
+        """Rebuild an index from `to_arrays` output, keeping the row arrays as given (e.g. memory-mapped)."""
+        index = cls.__new__(cls)
+        index._index_stops(stops)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index.trip_ids = np.asarray(arrays['trip_ids']).astype(object)
+        index.headsigns = np.where(arrays['headsigns@na'], None, np.asarray(arrays['headsigns']).astype(object))
+        index.slices = dict(zip(index.trip_ids.tolist(), zip(index.starts.tolist(), index.ends.tolist())))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.slices)
+
+    def __contains__(self, trip_id) -> bool:
+        return trip_id in self.slices
+
+    def locate(self, trip_id: str):
+        """Return the (start, end) row slice for `trip_id`, or None if it is unknown."""
+        return self.slices.get(trip_id)
+
+    def trip_id_of(self, row: int) -> str:
+        """Return the trip_id of a stop-time row."""
+        return self.trip_ids[self.row_trip[row]]
+
+    def stop_id_of(self, row: int) -> str:
+        """Return the stop_id of a stop-time row."""
+        return self.stop_ids[self.stop_codes[row]]
+
+    def stop_name_of(self, row: int) -> str:
+        """Return the stop name of a stop-time row."""
+        return self.stop_names[self.stop_codes[row]]
+
+    def trip_services(self, trips: pd.DataFrame) -> np.ndarray:
+        """Return the service_id of every trip ordinal (NaN for trips missing from `trips`)."""
+        trip_service = trips.drop_duplicates('trip_id').set_index('trip_id').service_id
+        return pd.Series(self.trip_ids, dtype=object).map(trip_service).to_numpy()
+
+# ========================== Departure Index ==========================
+
+class DepartureIndex:
+    """
+    Per (service_id, stop) departure times sorted ascending, pointing back into a TripIndex.
+
+    Finding the next departure from a stop is a `searchsorted` into one small
+    array; departures towards a given destination use `StopPairIndex` instead.
+    """
+
+    def __init__(self, trip_index: TripIndex, trips: pd.DataFrame):
+        self.trip_index = trip_index
+
+        rows = pd.DataFrame({
+            'service_id': trip_index.trip_services(trips)[trip_index.row_trip],
+            'stop_code': trip_index.stop_codes,
+            'departure': trip_index.departure_seconds,
+            'row': np.arange(len(trip_index.stop_codes)),
+        })
+        rows = rows[rows.service_id.notna() & (rows.departure >= 0)]
+        rows = rows.sort_values(['service_id', 'stop_code', 'departure'], kind='stable')
+
+        self.departures = rows.departure.to_numpy(dtype=np.int32)
+        self.positions = rows.row.to_numpy(dtype=np.int64)
+        bounds = rows.groupby(['service_id', 'stop_code'], sort=False).indices
+        self.group_keys = list(bounds)
+        self.group_bounds = np.array(
+            [(group_rows[0], group_rows[-1] + 1) for group_rows in bounds.values()], dtype=np.int64
+        ).reshape(-1, 2)
+        self._index_groups()
+
+    def _index_groups(self) -> None:
+        self.groups = {
+            key: (self.departures[start:end], self.positions[start:end])
+            for key, (start, end) in zip(self.group_keys, self.group_bounds.tolist())
+        }
+
+    def to_arrays(self) -> dict:
+        """Return the index as plain arrays for `save_snapshot` (rebuilt by `from_arrays`)."""
+        return {
+            'departures': self.departures,
+            'positions': self.positions,
+            'group_bounds': self.group_bounds,
+            'group_services': np.array([service_id for service_id, _ in self.group_keys]),
+            'group_stops': np.array([stop_code for _, stop_code in self.group_keys], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, trip_index: TripIndex, arrays: dict) -> 'DepartureIndex':
+        """Rebuild an index from `to_arrays` output; per-group arrays are views into the given ones."""
+        index = cls.__new__(cls)
+        index.trip_index = trip_index
+        index.departures = arrays['departures']
+        index.positions = arrays['positions']
+        index.group_bounds = arrays['group_bounds']
+        index.group_keys = list(zip(arrays['group_services'].tolist(), arrays['group_stops'].tolist()))
+        index._index_groups()
+        return index
+
+    def departures_from(self, stop_id, services, after: int, n=10) -> list:
+        """
+        Find the next `n` departures from `stop_id` to any later stop, on any trip.
+
+        Args:
+            services: iterable of (service_id, offset) pairs; `offset` shifts the
+                query into that service day, e.g. 86400 for yesterday's service.
+            after: query time in seconds since midnight of the query date.
+
+        Returns:
+            Sorted list of (departure_seconds, origin_row) tuples.
+        """
+        idx = self.trip_index
+        code = idx.stop_codes_by_id.get(stop_id)
+        if code is None:
+            return []
+
+        found = []
+        for service_id, offset in services:
+            group = self.groups.get((service_id, code))
+            if group is None:
+                continue
+            departures, positions = group
+            pos = int(np.searchsorted(departures, after + offset, side='left'))
+            onward = positions[pos:] + 1 < idx.ends[idx.row_trip[positions[pos:]]]
+            found.extend(
+                (int(departure) - offset, int(row))
+                for departure, row in zip(departures[pos:][onward][:n].tolist(), positions[pos:][onward][:n].tolist())
+            )
+
+        found.sort()
+        return found[:n]
+
+# ========================== Stop Pair Index ==========================
+
+class StopPairIndex:
+    """
+    (origin stop, destination stop) -> trips serving both in that order.
+
+    Every ordered pair of stops on every trip is one entry, stored CSR-style:
+    entries are sorted by pair key (origin code * n_stops + destination code)
+    and then by origin departure, `pair_keys` holds each distinct key and
+    `indptr` its slice bounds. A pair's trips are a `searchsorted` on the keys
+    plus a slice; the next departure after a time is one more `searchsorted`.
+    When a trip visits the destination more than once after boarding, only the
+    first visit is kept.
+    """
+
+    ARRAYS = ('pair_keys', 'indptr', 'departures', 'o_rows', 'd_rows')
+
+    def __init__(self, trip_index: TripIndex):
+        self.trip_index = trip_index
+        self.n_stops = len(trip_index.stop_ids)
+
+        idx = trip_index
+        lengths = idx.ends - idx.starts
+        o_rows, d_rows = [], []
+        for length in np.unique(lengths[lengths > 1]).tolist():
+            upper_o, upper_d = np.triu_indices(length, 1)
+            starts = idx.starts[lengths == length][:, None]
+            o_rows.append((starts + upper_o).ravel())
+            d_rows.append((starts + upper_d).ravel())
+        o_rows = np.concatenate(o_rows) if o_rows else np.empty(0, dtype=np.int64)
+        d_rows = np.concatenate(d_rows) if d_rows else np.empty(0, dtype=np.int64)
+
+        departures = idx.departure_seconds[o_rows]
+        keep = departures >= 0
+        o_rows, d_rows, departures = o_rows[keep], d_rows[keep], departures[keep]
+        keys = idx.stop_codes[o_rows].astype(np.int64) * self.n_stops + idx.stop_codes[d_rows]
+
+        # First visit of each destination after a boarding row
+        order = np.lexsort((d_rows, keys, o_rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (o_rows[order][1:] != o_rows[order][:-1]) | (keys[order][1:] != keys[order][:-1])
+        order = order[first]
+
+        order = order[np.lexsort((o_rows[order], departures[order], keys[order]))]
+        keys = keys[order]
+        self.departures = departures[order].astype(np.int32)
+        self.o_rows = o_rows[order].astype(np.int64)
+        self.d_rows = d_rows[order].astype(np.int64)
+        self.pair_keys, first_entry = np.unique(keys, return_index=True)
+        self.indptr = np.append(first_entry, len(keys)).astype(np.int64)
+
+    def to_arrays(self) -> dict:
+        """Return the index as arrays for `save_snapshot` (rebuilt by `from_arrays`)."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, trip_index: TripIndex, arrays: dict) -> 'StopPairIndex':
+        index = cls.__new__(cls)
+        index.trip_index = trip_index
+        index.n_stops = len(trip_index.stop_ids)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    def _slice(self, o_stop_id, d_stop_id):
+        """Return the (start, end) entry bounds of a stop pair, or None if no trip serves it."""
+        codes = self.trip_index.stop_codes_by_id
+        o_code, d_code = codes.get(o_stop_id), codes.get(d_stop_id)
+        if o_code is None or d_code is None:
+            return None
+        key = o_code * self.n_stops + d_code
+        pos = int(np.searchsorted(self.pair_keys, key))
+        if pos == len(self.pair_keys) or self.pair_keys[pos] != key:
+            return None
+        return int(self.indptr[pos]), int(self.indptr[pos + 1])
+
+    def trips_between(self, o_stop_id, d_stop_id):
+        """
+        Return (departures, origin_rows, destination_rows) arrays for every trip
+        from `o_stop_id` to `d_stop_id`, sorted by origin departure.
+        """
+        bounds = self._slice(o_stop_id, d_stop_id)
+        if bounds is None:
+            empty = np.empty(0, dtype=np.int64)
+            return empty.astype(np.int32), empty, empty
+        start, end = bounds
+        return self.departures[start:end], self.o_rows[start:end], self.d_rows[start:end]
+
+    def count(self, o_stop_id, d_stop_id) -> int:
+        """Return the number of trips from `o_stop_id` to `d_stop_id`."""
+        bounds = self._slice(o_stop_id, d_stop_id)
+        return 0 if bounds is None else bounds[1] - bounds[0]
+
+    def next_departures(self, o_stop_id, d_stop_id, after: int, offset=0, n=1) -> list:
+        """
+        Find the next `n` trips that leave `o_stop_id` at or after `after` and later stop at `d_stop_id`.
+
+        Args:
+            after: query time in seconds since midnight of the query date.
+            offset: shifts the query into the partition's service day, e.g.
+                86400 when searching yesterday's service.
+
+        Returns:
+            Sorted list of (departure_seconds, origin_row, destination_row) tuples,
+            with departure_seconds relative to the query date.
+        """
+        departures, o_rows, d_rows = self.trips_between(o_stop_id, d_stop_id)
+        pos = int(np.searchsorted(departures, after + offset, side='left'))
+        return [
+            (departure - offset, o_row, d_row)
+            for departure, o_row, d_row in zip(
+                departures[pos:pos + n].tolist(), o_rows[pos:pos + n].tolist(), d_rows[pos:pos + n].tolist()
+            )
+        ]
+
+# ========================== Headways ==========================
+
+TIME_BANDS = (
+    ('early', 0),
+    ('am_peak', 6 * 3600),
+    ('midday', 9 * 3600),
+    ('pm_peak', 15 * 3600),
+    ('evening', 19 * 3600),
+    ('night', 24 * 3600),
+)
+LINE_NAMES = {
+    'LE': 'Lakeshore East',
+    'LW': 'Lakeshore West',
+    'ST': 'Stouffville',
+    'RH': 'Richmond Hill',
+    'BR': 'Barrie',
+    'KI': 'Kitchener',
+    'MI': 'Milton',
+}
+
+
+def headway_table(trip_index: TripIndex, trips: pd.DataFrame) -> pd.DataFrame:
+    """
+    Headway statistics per corridor, direction, stop and time band.
+
+    Departures of each (corridor, direction_id, stop, band) are sorted and
+    differenced, so gaps never span two bands and a band's first departure has
+    no headway (a lone late-night trip has none rather than a 16-hour one).
+    Rows with stop_id None are line-level figures taken from each trip's first
+    departure.
+    Terminal arrivals are not departures and are left out.
 
     Returns:
-        Cleaned and merged DataFrame ready for delay analysis.
+        DataFrame with corridor, direction_id, direction (most common trip
+        headsign), stop_id, stop_name, band, departures, first/last departure
+        (GTFS times) and median/mean/min/max headway in minutes.
+    """
+    idx = trip_index
+    trip_info = trips.drop_duplicates('trip_id').set_index('trip_id').reindex(idx.trip_ids)
+    corridors = trip_corridors(trip_info.assign(route_id=trip_info.route_id.fillna(''))).to_numpy()
+    directions = (
+        trip_info.direction_id.fillna(0).astype(int).to_numpy() if 'direction_id' in trip_info
+        else np.zeros(len(idx.trip_ids), dtype=int)
+    )
+    headsigns = trip_info.trip_headsign.to_numpy() if 'trip_headsign' in trip_info else idx.headsigns
+
+    rows = np.arange(len(idx.stop_codes))
+    rows = rows[(rows + 1 < idx.ends[idx.row_trip]) & (idx.departure_seconds >= 0)]
+    first_rows = idx.starts[idx.departure_seconds[idx.starts] >= 0] if len(idx.starts) else idx.starts
+    all_rows = np.concatenate([rows, first_rows])
+    trip = idx.row_trip[all_rows]
+
+    df = pd.DataFrame({
+        'corridor': corridors[trip],
+        'direction_id': directions[trip],
+        'stop_code': np.concatenate([idx.stop_codes[rows], np.full(len(first_rows), -1, dtype=np.int32)]),
+        'departure': idx.departure_seconds[all_rows].astype(np.int64),
+        'headsign': headsigns[trip],
+    }).sort_values(['corridor', 'direction_id', 'stop_code', 'departure'], kind='stable')
+
+    band_starts = np.array([start for _, start in TIME_BANDS])
+    df['band'] = np.array([name for name, _ in TIME_BANDS])[np.searchsorted(band_starts, df.departure, side='right') - 1]
+    keys = ['corridor', 'direction_id', 'stop_code', 'band']
+    same_group = (df[keys] == df[keys].shift()).all(axis=1)
+    df['headway'] = df.departure.diff().where(same_group) / 60
+
+    table = df.groupby(keys, sort=False).agg(
+        departures=('departure', 'size'),
+        first_departure=('departure', 'min'),
+        last_departure=('departure', 'max'),
+        median_headway_min=('headway', 'median'),
+        mean_headway_min=('headway', 'mean'),
+        min_headway_min=('headway', 'min'),
+        max_headway_min=('headway', 'max'),
+    ).reset_index()
+
+    direction_names = (
+        df.dropna(subset=['headsign']).groupby(['corridor', 'direction_id']).headsign
+        .agg(lambda names: names.mode().iloc[0])
+    )
+    table.insert(2, 'direction', [
+        direction_names.get((corridor, direction)) for corridor, direction in zip(table.corridor, table.direction_id)
+    ])
+    line_level = table.stop_code.to_numpy() < 0
+    codes = np.where(line_level, 0, table.stop_code.to_numpy())
+    table.insert(3, 'stop_id', np.where(line_level, None, idx.stop_ids[codes]))
+    table.insert(4, 'stop_name', np.where(line_level, None, idx.stop_names[codes]))
+    table['first_departure'] = [seconds_to_gtfs_time(t) for t in table.first_departure.tolist()]
+    table['last_departure'] = [seconds_to_gtfs_time(t) for t in table.last_departure.tolist()]
+    return table.drop(columns='stop_code')
+
+# ========================== Service Partitions ==========================
+
+class ServicePartition:
+    """
+    Trips, stop times and their indexes for a set of corridors on one service date.
+
+    Partitions are the unit the simulator loads on demand and evicts from its LRU.
+    """
+
+    def __init__(self, corridors: tuple, service_date: int, trips: pd.DataFrame,
+                 stop_times: pd.DataFrame, stops: pd.DataFrame, arrays: dict = None, shapes: 'ShapeIndex' = None):
+        """
+        Build the indexes from `stop_times`, or, when `arrays` from a previous
+        `to_arrays` call are given, reattach them without touching stop times.
+        `shapes` is the feed's `ShapeIndex`, used to draw legs along the track.
+        """
+        self.corridors = corridors
+        self.service_date = service_date
+        self.trips = trips
+        self.service_ids = sorted(trips.service_id.dropna().unique().tolist())
+        self.shapes = shapes
+
+        if arrays is None:
+            self.digest = frames_digest(trips, stop_times)
+            self.trip_index = TripIndex(stop_times, stops)
+            self.departure_index = DepartureIndex(self.trip_index, trips)
+            self.pair_index = StopPairIndex(self.trip_index)
+            self.trip_shapes, self.shape_offsets = self._locate_shapes()
+        else:
+            self.digest = str(arrays['digest']) if 'digest' in arrays else None
+            self.trip_index = TripIndex.from_arrays(self._prefixed(arrays, 'trip_index/'), stops)
+            self.departure_index = DepartureIndex.from_arrays(
+                self.trip_index, self._prefixed(arrays, 'departure_index/')
+            )
+            self.pair_index = StopPairIndex.from_arrays(self.trip_index, self._prefixed(arrays, 'pair_index/'))
+            self.trip_shapes, self.shape_offsets = arrays['trip_shapes'], arrays['shape_offsets']
+
+    @staticmethod
+    def _prefixed(arrays: dict, prefix: str) -> dict:
+        return {key[len(prefix):]: value for key, value in arrays.items() if key.startswith(prefix)}
+
+    def _locate_shapes(self):
+        """Return the shape code of each trip ordinal and the shape point offset of each stop-time row."""
+        idx = self.trip_index
+        if self.shapes is None or 'shape_id' not in self.trips:
+            trip_shapes = np.full(len(idx.trip_ids), -1, dtype=np.int32)
+            return trip_shapes, np.full(len(idx.stop_codes), -1, dtype=np.int32)
+
+        trip_shape_ids = self.trips.drop_duplicates('trip_id').set_index('trip_id').shape_id.astype(object)
+        trip_shapes = (
+            pd.Series(idx.trip_ids, dtype=object).map(trip_shape_ids).map(self.shapes.codes_by_id)
+            .fillna(-1).to_numpy(dtype=np.int32)
+        )
+        offsets = self.shapes.stop_offsets(trip_shapes, idx.row_trip, idx.stop_coords[idx.stop_codes].astype(np.float64))
+        return trip_shapes, offsets
+
+    def leg_path(self, o_row: int, d_row: int) -> list:
+        """
+        Return the (lat, lon) points a trip passes between two of its stop-time rows.
+
+        Follows the trip's GTFS shape when it has one, otherwise joins the
+        stops' coordinates with straight lines.
+        """
+        shape = int(self.trip_shapes[self.trip_index.row_trip[o_row]])
+        start, end = int(self.shape_offsets[o_row]), int(self.shape_offsets[d_row])
+        if shape >= 0 and end > start:
+            return [tuple(p) for p in self.shapes.points(shape, start, end).tolist()]
+        idx = self.trip_index
+        return [tuple(p) for p in idx.stop_coords[idx.stop_codes[o_row:d_row + 1]].tolist()]
+
+    def to_arrays(self) -> dict:
+        """Return the trip, departure and stop-pair indexes and the shape offsets as arrays for `save_snapshot`."""
+        arrays = {f"trip_index/{key}": value for key, value in self.trip_index.to_arrays().items()}
+        arrays.update({f"departure_index/{key}": value for key, value in self.departure_index.to_arrays().items()})
+        arrays.update({f"pair_index/{key}": value for key, value in self.pair_index.to_arrays().items()})
+        arrays['trip_shapes'] = self.trip_shapes
+        arrays['shape_offsets'] = self.shape_offsets
+        arrays['digest'] = np.array(self.digest or "")
+        return arrays
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the partition's trips and index arrays (memory-mapped ones included)."""
+        total = int(self.trips.memory_usage(deep=True).sum())
+        for value in self.to_arrays().values():
+            total += value.nbytes
+        return total
+
+    @functools.cached_property
+    def journey_planner(self) -> ConnectionScanPlanner:
+        """Connection scan planner over the partition's trips, built on the first journey query."""
+        return ConnectionScanPlanner(self.trip_index, self.trips)
+
+    @functools.cached_property
+    def headways(self) -> pd.DataFrame:
+        """Headway table of the partition (see `headway_table`), computed on first use."""
+        return headway_table(self.trip_index, self.trips)
+
+    def services(self, offset=0) -> list:
+        """Return (service_id, offset) pairs for the index queries, shifted by `offset` seconds."""
+        return [(service_id, offset) for service_id in self.service_ids]
+
+# ========================== GTFS Feed ==========================
+
+class GtfsFeed:
+    """
+    Everything derived from one version of the GTFS feed: stops, their indexes
+    and embeddings, and an LRU of (corridors, service date) partitions.
+
+    `GoAPISimulator` holds one feed at a time and replaces it wholesale on reload.
     """
-    # Merge L101 and L102 by 'TripId' or other shared identifier
-    merged = pd.merge(l101_df, l102_df, on='TripId', how='left')
 
-    # Merge delay codes into the result (e.g., on DelayCode column)
-    merged = pd.merge(merged, delay_code_info_df, on='DelayCode', how='left')
+    def __init__(self, data_dir: str, cache_dir: str, use_snapshot=True, max_partitions=8, previous=None):
+        """
+        Load the stops of the feed in `data_dir`, through its snapshot when possible.
+
+        When `previous` (the feed being replaced) has identical stops, its stop
+        indexes are reused rather than rebuilt.
+        """
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.use_snapshot = use_snapshot
+        self.max_partitions = max_partitions
+
+        self.fingerprint = feed_fingerprint(data_dir)
+        path = snapshot_path(cache_dir, self.fingerprint, "stops")
+        emb_path = embeddings_path(path)
+        self.snapshot_file = path
+
+        if use_snapshot and os.path.exists(path) and os.path.exists(emb_path):
+            frames, arrays = load_snapshot(path, mmap=True)
+            stop_embeddings = np.load(emb_path, mmap_mode='r')
+        else:
+            frames, arrays = self._load_stops(data_dir)
+            stop_embeddings = normalize_rows(arrays.pop('stop_embeddings'))
+            if use_snapshot:
+                save_snapshot(path, frames, arrays)
+                save_matrix(emb_path, stop_embeddings)
+                if previous is None:
+                    prune_snapshots(cache_dir, self.fingerprint)
+                stop_embeddings = np.load(emb_path, mmap_mode='r')
+
+        self.stops = frames['stops']
+        self.stops_digest = frames_digest(self.stops)
+        self.corridors = tuple(arrays['corridors'].tolist())
+        self.calendar = ServiceCalendar.from_arrays(
+            {key[len('calendar/'):]: value for key, value in arrays.items() if key.startswith('calendar/')}
+        )
+        self.shapes = ShapeIndex.from_arrays(
+            {key[len('shapes/'):]: value for key, value in arrays.items() if key.startswith('shapes/')}
+        )
+        self.shapes_digest = arrays_digest(self.shapes.to_arrays())
+        self.stop_embeddings = stop_embeddings
+        self.variant_embeddings = None
+
+        if previous is not None and previous.stops_digest == self.stops_digest:
+            self.stop_spatial_index = previous.stop_spatial_index
+            self.stop_name_resolver = previous.stop_name_resolver
+        else:
+            self.stop_spatial_index = StopSpatialIndex(self.stops)
+            self.stop_name_resolver = StopNameResolver(self.stops)
+
+        # Trips and stop times load lazily, one (corridors, service date) partition at a time
+        self.partitions = OrderedDict()
+        self._partition_lock = threading.Lock()
+        self._build_locks = {}
+        # Set by `GoAPISimulator.reload` once a newer feed has replaced this one
+        self.retired = False
+
+    @staticmethod
+    def _load_stops(data_dir):
+        """
+        Parse stops.csv, list the corridors present in trips.txt and build the
+        service calendar and the shapes index.
+
+        Returns:
+            Tuple of (frames, arrays) in the layout stored by `save_snapshot`.
+        """
+        # stop_id is read as text to match the explicit stop_times dtypes
+        stops = pd.read_csv(os.path.join(data_dir, "stops.csv"), dtype={'stop_id': str})
+        stop_embeddings = np.array(stops.pop('embedding').apply(ast.literal_eval).tolist(), dtype=np.float32)
+
+        routes = pd.read_csv(os.path.join(data_dir, "trips.txt"), usecols=['route_id'], dtype=str)
+        corridors = np.array(sorted(trip_corridors(routes).unique()), dtype=str)
+
+        arrays = {'stop_embeddings': stop_embeddings, 'corridors': corridors}
+        arrays.update({f"calendar/{key}": value for key, value in ServiceCalendar.from_feed(data_dir).to_arrays().items()})
+        arrays.update({f"shapes/{key}": value for key, value in ShapeIndex.from_feed(data_dir).to_arrays().items()})
+        return {'stops': stops}, arrays
+
+    def corridor_key(self, corridor) -> tuple:
+        """
+        Normalize a corridor argument (None for all, a code, or a list of codes) to a sorted tuple.
+
+        Raises:
+            ValueError: if a code is not a corridor of the feed. Partition keys
+                name snapshot files, so only the feed's own codes get through.
+        """
+        if corridor is None:
+            return self.corridors
+        key = (corridor,) if isinstance(corridor, str) else tuple(sorted(set(corridor)))
+        unknown = [c for c in key if c not in self.corridors]
+        if unknown:
+            raise ValueError(f"Unknown corridor(s) {unknown}; valid corridors: {', '.join(self.corridors)}.")
+        return key
+
+    def partition(self, corridors: tuple, date: int) -> ServicePartition:
+        """Return the partition for a `corridor_key` tuple and service date, loading it on first use."""
+        key = (corridors, date)
+        partition = self._cached_partition(key)
+        if partition is not None:
+            return partition
+
+        # Threads asking for the same key wait for the first one's build instead of repeating it
+        with self._build_lock(key):
+            partition = self._cached_partition(key)
+            if partition is not None:
+                return partition
+
+            # Indexes are snapshotted per partition key and memory-mapped, so worker
+            # processes attach to the same pages instead of rebuilding private copies
+            index_path = self._index_path(key)
+            if self.use_snapshot and os.path.exists(index_path):
+                frames, arrays = load_snapshot(index_path, mmap=True)
+                partition = ServicePartition(key[0], key[1], frames['trips'], None, self.stops, arrays=arrays, shapes=self.shapes)
+            else:
+                trips, stop_times = self._partition_frames(key)
+                partition = self._build_partition(key, trips, stop_times)
+
+            self._remember(key, partition)
+            return partition
+
+    def _cached_partition(self, key):
+        with self._partition_lock:
+            partition = self.partitions.get(key)
+            if partition is not None:
+                self.partitions.move_to_end(key)
+            return partition
+
+    def _build_lock(self, key) -> threading.Lock:
+        """Return the lock serializing loads of `key`, a partition key or ('day', date)."""
+        with self._partition_lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def _index_path(self, key) -> str:
+        return snapshot_path(self.cache_dir, self.fingerprint, f"{'+'.join(key[0])}_{key[1]}_index")
+
+    def _partition_frames(self, key):
+        parts = [self._load_partition_frames(c, key[1]) for c in key[0]]
+        trips = pd.concat([p['trips'] for p in parts], ignore_index=True)
+        stop_times = pd.concat([p['stop_times'] for p in parts], ignore_index=True)
+        return trips, stop_times
+
+    @property
+    def saves_snapshots(self) -> bool:
+        """
+        Whether partitions built by this feed are written to the snapshot cache.
+
+        A retired feed still answers in-flight queries, but a partition it builds
+        after the swap is read from the new source files; saving it under the old
+        fingerprint would outlive `prune_snapshots` with mislabeled data.
+        """
+        return self.use_snapshot and not self.retired
 
-    return merged
+    def _build_partition(self, key, trips, stop_times) -> ServicePartition:
+        partition = ServicePartition(key[0], key[1], trips, stop_times, self.stops, shapes=self.shapes)
+        if self.saves_snapshots:
+            save_snapshot(self._index_path(key), {'trips': trips}, partition.to_arrays())
+        return partition
+
+    def loaded_keys(self) -> list:
+        """Keys of the partitions currently in memory, least recently used first."""
+        with self._partition_lock:
+            return list(self.partitions)
+
+    def loaded(self, key):
+        """Return the in-memory partition for `key` without loading it or touching the LRU order, or None."""
+        with self._partition_lock:
+            return self.partitions.get(key)
+
+    def _remember(self, key, partition) -> None:
+        with self._partition_lock:
+            self.partitions[key] = partition
+            self.partitions.move_to_end(key)
+            while len(self.partitions) > self.max_partitions:
+                self.partitions.popitem(last=False)
+
+    def warm(self, keys, previous=None):
+        """
+        Load the partitions `keys` into this feed ahead of use.
+
+        A partition of `previous` is carried over when the stops, the shapes and
+        the partition's trips and stop times are unchanged; it is only re-saved
+        under this feed's fingerprint, not re-indexed.
+
+        Returns:
+            Tuple of (rebuilt keys, reused keys).
+        """
+        rebuilt, reused = [], []
+        same_stops = (
+            previous is not None and previous.stops_digest == self.stops_digest
+            and previous.shapes_digest == self.shapes_digest
+        )
+        for key in keys:
+            trips, stop_times = self._partition_frames(key)
+            old = previous.loaded(key) if same_stops else None
+            if old is not None and old.digest == frames_digest(trips, stop_times):
+                if self.use_snapshot:
+                    save_snapshot(self._index_path(key), {'trips': old.trips}, old.to_arrays())
+                self._remember(key, old)
+                reused.append(key)
+            else:
+                self._remember(key, self._build_partition(key, trips, stop_times))
+                rebuilt.append(key)
+        return rebuilt, reused
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by stops, stop embeddings, shapes and the loaded partitions."""
+        total = int(self.stops.memory_usage(deep=True).sum()) + self.stop_embeddings.nbytes
+        total += sum(value.nbytes for value in self.shapes.to_arrays().values())
+        with self._partition_lock:
+            partitions = list(self.partitions.values())
+        return total + sum(partition.memory_bytes() for partition in partitions)
+
+    def _load_partition_frames(self, corridor: str, date: int) -> dict:
+        """
+        Load one corridor/date partition from its snapshot, building the whole service day if missing.
+
+        `corridor` must come from `corridor_key`, i.e. be one of `self.corridors`.
+        """
+        path = snapshot_path(self.cache_dir, self.fingerprint, f"{corridor}_{date}")
+        if self.use_snapshot and os.path.exists(path):
+            return load_snapshot(path, mmap=True)[0]
+
+        # One service day is parsed at a time; threads that waited re-check the snapshot it left
+        with self._build_lock(('day', date)):
+            if self.use_snapshot and os.path.exists(path):
+                return load_snapshot(path, mmap=True)[0]
+
+            day = load_service_day(self.data_dir, date, self.calendar.services_on(date))
+            empty = day.pop(None)
+            for name in self.corridors:
+                day.setdefault(name, empty)
+            if self.saves_snapshots:
+                for name, frames in day.items():
+                    save_snapshot(snapshot_path(self.cache_dir, self.fingerprint, f"{name}_{date}"), frames)
+            return day[corridor]
 
 # ========================== GoAPISimulator ==========================
 
 class GoAPISimulator:
-    def __init__(self, data_dir="Data/gtfs-2018", start_date=20180301, end_date=20180308, corridor='LE'):
+    def __init__(self, data_dir="Data/gtfs-2018", start_date=20180301, end_date=20180308, corridor='LE',
+                 cache_dir=None, use_snapshot=True, encoding_cache_size=1024, encoding_cache_path=None,
+                 embedding_model=DEFAULT_EMBEDDING_MODEL, embedding_backend=None, quantize_embeddings=False,
+                 max_partitions=8, delay_log_dir="Data/L101 and L102 - 2018", delay_stat_columns=None):
         """
-        Initialize and load GTFS data, stop embeddings, and delay logs.
-        """
-        # Load GTFS data
-        calendar_dates = pd.read_csv(os.path.join(data_dir, "calendar_dates.txt"))
-        trips = pd.read_csv(os.path.join(data_dir, "trips.txt"))
-        stop_times = pd.read_csv(os.path.join(data_dir, "stop_times.txt"))
+        Initialize and load GTFS stops, stop embeddings, and delay logs.
 
-        self.stops = pd.read_csv(os.path.join(data_dir, "stops.csv"))
-        self.stops['embedding'] = self.stops['embedding'].apply(ast.literal_eval)
+        Trips and stop times are partitioned by corridor and service date and
+        loaded on demand (see `partition`); at most `max_partitions` stay in
+        memory, least recently used first out. `start_date` is the default
+        query date and `corridor` / `start_date`-`end_date` select the delay logs
+        read from `delay_log_dir`. `delay_stat_columns` overrides the
+        `DelayStatistics` column names (e.g. {'delay_col': 'MinutesLate'}).
 
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-roberta-large-v1')
+        Stops and every partition are cached as snapshots under `cache_dir`
+        (default: `<data_dir>/.snapshots`). Later starts load the snapshots
+        directly; they are rebuilt whenever the source files change. A new feed
+        can be picked up without a restart with `reload` or `watch_feed`.
+        Stop embeddings are kept as a unit-normalized float32 `.npy` next to the
+        snapshot and memory-mapped read-only, so workers share the same pages;
+        the same goes for the numeric columns of every snapshot and for each
+        partition's trip and departure index arrays.
 
-        # Filter by valid service dates and corridor
-        service_ids = calendar_dates[
-            (calendar_dates.service_id >= start_date) &
-            (calendar_dates.service_id <= end_date)
-        ].service_id.tolist()
+        Query encodings are memoized in an LRU of `encoding_cache_size` entries;
+        pass `encoding_cache_path` to persist them in SQLite across restarts.
 
-        valid_trips = trips[
-            trips.service_id.isin(service_ids) & trips.route_id.str.endswith(corridor)
-        ]
+        The embedding model is only loaded on the first embedding search. Any
+        model, backend ('onnx', 'openvino') or int8 quantization other than the
+        default regenerates the stop embeddings with that model on first use
+        and caches them next to the snapshot.
+        """
+        self.data_dir = data_dir
+        self.start_date, self.end_date, self.corridor = start_date, end_date, corridor
+        self.cache_dir = cache_dir or os.path.join(data_dir, ".snapshots")
+        self.use_snapshot = use_snapshot
 
-        self.stop_time_clean = stop_times[
-            stop_times.trip_id.isin(valid_trips.trip_id.unique())
-        ]
+        # Stops, their indexes and the partition LRU; replaced as a whole by `reload`
+        self.max_partitions = max_partitions
+        self.feed = GtfsFeed(data_dir, self.cache_dir, use_snapshot, max_partitions)
+        self.last_reload = None
+        self._reload_lock = threading.Lock()
+
+        # Embedding model and (for non-default models) stop embeddings load lazily
+        self.embedding_config = (embedding_model, embedding_backend, quantize_embeddings)
+        self.embedding_variant = embedding_variant(*self.embedding_config)
+        self._embedding_model = None
+        self._embedding_lock = threading.Lock()
+
+        self.query_encodings = EncodingCache(
+            lambda text: self.embedding_model.encode(text),
+            maxsize=encoding_cache_size,
+            path=encoding_cache_path,
+            namespace=embedding_model if self.embedding_variant is None else f"{embedding_model}:{self.embedding_variant}",
+        )
 
         # Load and filter delay logs
-        l101_df, l102_df, delay_code_info_df = read_from_file('Data/L101 and L102 - 2018')
-        delay_logs = merge_data(l101_df, l102_df, delay_code_info_df)
+        self.delay_log_dir = delay_log_dir
+        delay_logs = self._load_delay_logs(delay_log_dir, corridor)
 
+        window = delay_logs.OperationDateTime.to_numpy(dtype='datetime64[D]')
         self.delay_logs_clean_df = delay_logs[
-            (delay_logs.OperationDateTime.dt.date >= datetime.date(2018, 3, 1)) &
-            (delay_logs.OperationDateTime.dt.date <= datetime.date(2018, 3, 8)) &
-            (delay_logs.CorridorId == corridor) &
+            (window >= self._date64(start_date)) &
+            (window <= self._date64(end_date)) &
             (delay_logs.DelayCode.notnull())
-        ].sort_values(by='OperationDateTime')
+        ].sort_values(by='OperationDateTime', kind='stable').reset_index(drop=True)
+        self.delay_log_index = DelayLogIndex(self.delay_logs_clean_df)
+
+        # Historical delay distributions over every logged date on the corridor
+        self.delay_stats = DelayStatistics(delay_logs, **(delay_stat_columns or {}))
+
+    def _load_delay_logs(self, delay_log_dir, corridor) -> pd.DataFrame:
+        """
+        Load the corridor's merged L101/L102/DelayCodeInfo logs, through a snapshot when possible.
+
+        Delay-log snapshots live in their own `delay_logs` folder under the cache
+        directory, keyed by a fingerprint of the delay-log files, so a GTFS
+        update does not invalidate them and vice versa.
+        """
+        cache_dir = os.path.join(self.cache_dir, "delay_logs")
+        fingerprint = feed_fingerprint(delay_log_dir, DELAY_LOG_SOURCE_FILES)
+        path = snapshot_path(cache_dir, fingerprint, f"delay_logs_{corridor}")
+
+        if self.use_snapshot and os.path.exists(path):
+            frames, _ = load_snapshot(path, mmap=True)
+            return frames['delay_logs']
+
+        delay_logs = merge_data(*read_from_file(delay_log_dir), corridor=corridor)
+        if self.use_snapshot:
+            save_snapshot(path, {'delay_logs': delay_logs})
+            prune_snapshots(cache_dir, fingerprint)
+        return delay_logs
+
+    @staticmethod
+    def _date64(date) -> np.datetime64:
+        """Convert a YYYYMMDD date (int or str) to numpy datetime64[D]."""
+        date = str(date)
+        return np.datetime64(f"{date[:4]}-{date[4:6]}-{date[6:8]}")
+
+    # ========================== Feed ==========================
+
+    @property
+    def fingerprint(self) -> str:
+        return self.feed.fingerprint
+
+    @property
+    def stops(self) -> pd.DataFrame:
+        return self.feed.stops
+
+    @property
+    def corridors(self) -> tuple:
+        return self.feed.corridors
+
+    @property
+    def stop_spatial_index(self):
+        return self.feed.stop_spatial_index
+
+    @property
+    def stop_name_resolver(self):
+        return self.feed.stop_name_resolver
+
+    @property
+    def shapes(self):
+        return self.feed.shapes
+
+    @property
+    def partitions(self) -> OrderedDict:
+        return self.feed.partitions
+
+    def partition(self, date, corridor=None) -> ServicePartition:
+        """
+        Return the trips and indexes for `corridor` on service date `date`, loading them on first use.
+
+        Args:
+            date: service date as YYYYMMDD (int or str).
+            corridor: a corridor code, a list of codes, or None for every corridor.
+        """
+        feed = self.feed
+        return feed.partition(feed.corridor_key(corridor), int(date))
+
+    def reload(self, background=False):
+        """
+        Pick up a new GTFS feed in `data_dir` without a restart.
+
+        The new feed is built off to the side and swapped in with a single
+        reference assignment, so in-flight queries finish on the old one. The
+        partitions currently in memory are pre-loaded from the new feed; those
+        whose trips and stop times are unchanged (and whose stops are unchanged)
+        keep their existing indexes instead of being rebuilt.
+
+        Args:
+            background: run in a daemon thread and return it instead of the report.
+
+        Returns:
+            Report dictionary (also kept as `last_reload`) with changed,
+            fingerprint, build_seconds, memory_bytes, and the rebuilt, reused
+            and dropped (corridor no longer in the feed) partition keys.
+        """
+        if background:
+            thread = threading.Thread(target=self.reload, name="gtfs-reload", daemon=True)
+            thread.start()
+            return thread
+
+        with self._reload_lock:
+            old = self.feed
+            if feed_fingerprint(self.data_dir) == old.fingerprint:
+                return {'changed': False, 'fingerprint': old.fingerprint}
+
+            started = perf_counter()
+            new = GtfsFeed(self.data_dir, self.cache_dir, self.use_snapshot, self.max_partitions, previous=old)
+            # Partitions of corridors no longer in the feed are dropped, not warmed
+            keys = old.loaded_keys()
+            dropped = [key for key in keys if not set(key[0]) <= set(new.corridors)]
+            rebuilt, reused = new.warm([key for key in keys if key not in dropped], previous=old)
+            if self.embedding_variant is not None and old.variant_embeddings is not None:
+                new.variant_embeddings = self._build_stop_embeddings(new)
+
+            self.feed = new
+            old.retired = True
+            if self.use_snapshot:
+                prune_snapshots(self.cache_dir, new.fingerprint)
+
+            self.last_reload = {
+                'changed': True,
+                'fingerprint': new.fingerprint,
+                'build_seconds': perf_counter() - started,
+                'memory_bytes': new.memory_bytes(),
+                'rebuilt': rebuilt,
+                'reused': reused,
+                'dropped': dropped,
+            }
+            return self.last_reload
+
+    def watch_feed(self, interval=300.0) -> threading.Event:
+        """
+        Poll the feed fingerprint every `interval` seconds and reload when it changes.
+
+        Returns:
+            Event that stops the watcher when set.
+        """
+        stop = threading.Event()
+
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception:
+                    # A feed still being copied in can be unreadable; keep the
+                    # current feed, log why and try again next round
+                    logger.exception("GTFS reload from %s failed", self.data_dir)
+
+        threading.Thread(target=watch, name="gtfs-watch", daemon=True).start()
+        return stop
+
+    # ========================== Embeddings ==========================
+
+    @property
+    def embedding_model(self):
+        """SentenceTransformer used for query encoding, loaded on first access."""
+        if self._embedding_model is None:
+            with self._embedding_lock:
+                if self._embedding_model is None:
+                    self._embedding_model = load_embedding_model(*self.embedding_config)
+        return self._embedding_model
+
+    @property
+    def stop_embeddings(self) -> np.ndarray:
+        """Unit-normalized float32 stop-embedding matrix, row-aligned with `self.stops`."""
+        return self._feed_embeddings(self.feed)
+
+    def _feed_embeddings(self, feed) -> np.ndarray:
+        """Stop-embedding matrix of `feed` for the configured model, row-aligned with `feed.stops`."""
+        if self.embedding_variant is None:
+            return feed.stop_embeddings
+        if feed.variant_embeddings is None:
+            feed.variant_embeddings = self._build_stop_embeddings(feed)
+        return feed.variant_embeddings
+
+    def _build_stop_embeddings(self, feed) -> np.ndarray:
+        """Encode every stop name of `feed` with the configured model, reusing a cached matrix when present."""
+        path = embeddings_path(feed.snapshot_file, self.embedding_variant)
+        if self.use_snapshot and os.path.exists(path):
+            return np.load(path, mmap_mode='r')
+
+        matrix = normalize_rows(self.embedding_model.encode(feed.stops.stop_name.tolist(), batch_size=64))
+        if self.use_snapshot:
+            save_matrix(path, matrix)
+            return np.load(path, mmap_mode='r')
+        return matrix
 
     # ========================== Control Log ==========================
 
+    CONTROL_LOG_FIELDS = {
+        'OperationDateTime': 'timestamp',
+        'TripId': 'trip_id',
+        'CorridorId': 'corridor',
+        'DelayCode': 'delay_code',
+    }
+
     def get_control_log(self) -> dict:
         """Return one random delay log as a dict."""
         return self.delay_logs_clean_df.sample(1).to_dict(orient='records')[0]
 
+    def get_delay_logs(self, start=None, end=None, corridor=None, station=None, delay_code=None) -> pd.DataFrame:
+        """
+        Return delay logs in the [start, end) window, in time order, matching the given filters.
+
+        Args:
+            start, end: window bounds (datetime, Timestamp or string); None is open.
+            corridor, station, delay_code: optional exact-match filters.
+        """
+        rows = self.delay_log_index.query(start, end, corridor=corridor, station=station, delay_code=delay_code)
+        return self.delay_logs_clean_df.iloc[rows]
+
+    def _control_log_events(self, start=None, end=None, fields=None):
+        """
+        Yield (offset_seconds, event) for delay logs in OperationDateTime order.
+
+        `offset_seconds` is the event's log time relative to the first event
+        emitted. Events are compact dicts with the CONTROL_LOG_FIELDS columns
+        renamed, plus any extra `fields` under their original names.
+        """
+        logs = self.get_delay_logs(start, end)
+        if logs.empty:
+            return
+
+        columns = {**self.CONTROL_LOG_FIELDS, **{field: field for field in fields or ()}}
+        values = {
+            key: logs[col].astype(str).tolist() if col == 'OperationDateTime' else logs[col].tolist()
+            for col, key in columns.items()
+        }
+        times = logs.OperationDateTime.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        offsets = ((times - times[0]) / 1e9).tolist()
+
+        for i, offset in enumerate(offsets):
+            yield offset, {key: column[i] for key, column in values.items()}
+
+    def replay_control_logs(self, speedup=60.0, start=None, end=None, fields=None):
+        """
+        Replay delay logs in OperationDateTime order at `speedup` times real time.
+
+        Args:
+            speedup: 1.0 for real time, 60.0 for one log-minute per second, or
+                None to emit as fast as possible.
+            start, end: optional log-time window [start, end).
+            fields: extra delay-log columns to include in each event.
+
+        Yields:
+            Event dicts (timestamp, trip_id, corridor, delay_code, ...) with
+            `lag_seconds`: how far behind its scheduled wall-clock time the event
+            was emitted. A growing lag means the consumer is building a backlog.
+        """
+        wall_start = monotonic()
+        for offset, event in self._control_log_events(start, end, fields):
+            due = offset / speedup if speedup else 0.0
+            elapsed = monotonic() - wall_start
+            if elapsed < due:
+                sleep(due - elapsed)
+                elapsed = due
+            yield {**event, 'lag_seconds': elapsed - due}
+
+    async def areplay_control_logs(self, speedup=60.0, start=None, end=None, fields=None):
+        """Async iterator version of `replay_control_logs`, pacing with `asyncio.sleep`."""
+        wall_start = monotonic()
+        for offset, event in self._control_log_events(start, end, fields):
+            due = offset / speedup if speedup else 0.0
+            elapsed = monotonic() - wall_start
+            if elapsed < due:
+                await asyncio.sleep(due - elapsed)
+                elapsed = due
+            else:
+                await asyncio.sleep(0)
+            yield {**event, 'lag_seconds': elapsed - due}
+
+    def usual_delay(self, trip_id=None, stop_id=None, departure_seconds=None):
+        """
+        Typical delay in minutes for a GTFS trip, from the precomputed delay history.
+
+        Falls back from the trip's train number to the stop, then to the hour of
+        departure; None if there is no history for any of them.
+        """
+        trip_number = trip_id.rsplit('-', 1)[-1] if trip_id else None
+        hour = int(departure_seconds) // 3600 % 24 if departure_seconds is not None and departure_seconds >= 0 else None
+        return self.delay_stats.usual_delay(trip=trip_number, station=stop_id, hour=hour)
+
     # ========================== Trip Info ============================
 
-    def get_trip_info(self, trip_id: str, date='20180301', corridor='LE') -> dict:
+    def get_trip_info(self, trip_id: str, date=None, corridor='LE') -> dict:
         """
         Retrieve full trip info, including all stop times and OD summary.
 
         Args:
-            trip_id: numeric or string trip ID (without GTFS prefix).
-            date: GTFS service date string, e.g., '20180301'.
+            trip_id: numeric or string trip ID (without GTFS prefix), or a full GTFS trip_id.
+            date: service date as YYYYMMDD, 'today', or None for `start_date`.
             corridor: route corridor identifier (e.g., 'LE').
 
         Returns:
             Dictionary with origin, destination, stop times, and trip summary.
         """
-        full_trip_id = f"{date}-{corridor}-{trip_id}"
-        trip_data = self.stop_time_clean[
-            self.stop_time_clean.trip_id == full_trip_id
-        ].merge(self.stops, on='stop_id')
+        date = self._query_date(None, date)
+        partition = self.partition(date, corridor)
+        idx = partition.trip_index
+        full_trip_id = self._resolve_trip_id(partition, trip_id, date, corridor)
+        start, end = idx.locate(full_trip_id)
 
-        if trip_data.empty:
-            raise ValueError(f"Trip ID {full_trip_id} not found.")
-
-        try:
-            headsign = trip_data[trip_data.stop_sequence == trip_data.stop_sequence.min()].stop_headsign.values[0]
-        except IndexError:
+        headsign = idx.headsigns[idx.row_trip[start]]
+        if pd.isna(headsign):
             raise ValueError(f"Missing stop_headsign for trip {trip_id}.")
 
+        stop_names = idx.stop_names[idx.stop_codes[start:end]].tolist()
+        arrivals = [seconds_to_gtfs_time(t) for t in idx.arrival_seconds[start:end].tolist()]
+        departures = [seconds_to_gtfs_time(t) for t in idx.departure_seconds[start:end].tolist()]
+
         stop_sequence = [
             {
                 'stop_sequence': seq,
-                'stop_name': row.stop_name,
-                'arrival_time': row.arrival_time,
-                'departure_time': row.departure_time,
+                'stop_name': name,
+                'arrival_time': arrival,
+                'departure_time': departure,
             }
-            for seq, row in trip_data.groupby('stop_sequence').first().iterrows()
+            for seq, name, arrival, departure in zip(
+                idx.stop_sequence[start:end].tolist(), stop_names, arrivals, departures
+            )
         ]
 
         return {
             'trip_id': full_trip_id,
             'stop_headsign': headsign,
-            'origin': trip_data.iloc[0].stop_name,
-            'destination': trip_data.iloc[-1].stop_name,
-            'departure_time': trip_data.iloc[0].departure_time,
-            'arrival_time': trip_data.iloc[-1].arrival_time,
+            'origin': stop_names[0],
+            'destination': stop_names[-1],
+            'departure_time': departures[0],
+            'arrival_time': arrivals[-1],
             'stop_sequence': stop_sequence,
         }
 
+    def get_trip_shape(self, trip_id: str, from_stop_id=None, to_stop_id=None, date=None, corridor='LE') -> list:
+        """
+        Return the geometry of a trip, or of the part between two of its stops, from local GTFS shapes.
+
+        Args:
+            trip_id, date, corridor: as in `get_trip_info`.
+            from_stop_id, to_stop_id: stops to slice between; default to the
+                trip's first and last stop.
+
+        Returns:
+            List of (lat, lon) points along the track; straight lines between
+            stops when the trip has no shape.
+        """
+        date = self._query_date(None, date)
+        partition = self.partition(date, corridor)
+        idx = partition.trip_index
+        start, end = idx.locate(self._resolve_trip_id(partition, trip_id, date, corridor))
+
+        stop_ids = idx.stop_ids[idx.stop_codes[start:end]].tolist()
+        try:
+            o_row = start + (stop_ids.index(from_stop_id) if from_stop_id is not None else 0)
+            d_row = start + (stop_ids.index(to_stop_id, o_row - start) if to_stop_id is not None else len(stop_ids) - 1)
+        except ValueError:
+            raise ValueError(f"Trip {trip_id} does not run from {from_stop_id} to {to_stop_id}.") from None
+        return partition.leg_path(o_row, d_row)
+
+    @staticmethod
+    def _resolve_trip_id(partition, trip_id, date, corridor) -> str:
+        """Return the GTFS trip_id in `partition` for a full trip_id or a bare trip number."""
+        # GTFS trip IDs are "<service_id>-<corridor>-<trip number>"; try each service active on the date
+        candidates = [f"{service_id}-{corridor}-{trip_id}" for service_id in partition.service_ids]
+        full_trip_id = next((c for c in [str(trip_id), *candidates] if c in partition.trip_index), None)
+        if full_trip_id is None:
+            raise ValueError(f"Trip ID {date}-{corridor}-{trip_id} not found.")
+        return full_trip_id
+
     # ========================== Stop ID Lookup ==========================
 
     def get_stop_id(self, stop_name=None, lat=None, long=None, method=None) -> str:
@@ -146,7 +1483,9 @@ class GoAPISimulator:
         Args:
             stop_name: name of the station/stop.
             lat, long: coordinates if using geo search.
-            method: one of None, 'embedding_search', 'geo_search'.
+            method: one of None, 'resolve', 'embedding_search', 'geo_search'.
+                'resolve' tries exact and fuzzy name matching before embeddings;
+                see `resolve_stop`.
 
         Returns:
             stop_id (str)
@@ -155,43 +1494,345 @@ class GoAPISimulator:
             if method is None:
                 return self.stops[self.stops.stop_name == stop_name].stop_id.values[0]
 
+            elif method == 'resolve':
+                if stop_name is None:
+                    raise ValueError("stop_name is required for resolve")
+                return self.resolve_stop(stop_name)['stop_id']
+
             elif method == 'embedding_search':
                 if stop_name is None:
                     raise ValueError("stop_name is required for embedding search")
-                input_emb = self.embedding_model.encode(stop_name)
-                sim_scores = self.stops.embedding.apply(
-                    lambda x: self.calculate_cosine_similarity(input_emb, x)
-                )
-                return self.stops.iloc[sim_scores.idxmax()].stop_id
+                return self.search_stops(stop_name, k=1)[0]['stop_id']
 
             elif method == 'geo_search':
                 if lat is None or long is None:
                     raise ValueError("Both lat and long are required for geo search")
-                dist_scores = self.stops.apply(
-                    lambda row: self.calculate_distance(lat, long, row.stop_lat, row.stop_lon),
-                    axis=1
-                )
-                return self.stops.iloc[dist_scores.idxmin()].stop_id
+                return self.nearest_stops(lat, long, k=1)[0]['stop_id']
 
         except IndexError:
             raise ValueError(f"Stop not found using method: {method}")
 
+    def resolve_stop(self, stop_name: str) -> dict:
+        """
+        Resolve a free-text stop name through the exact, fuzzy and embedding tiers.
+
+        The embedding model only runs when neither the normalized-name map nor
+        the trigram index gives a confident match.
+
+        Returns:
+            Dict with stop_id, stop_name, score and the tier that answered.
+        """
+        return self.resolve_stops([stop_name])[0]
+
+    def resolve_stops(self, stop_names: list) -> list:
+        """Resolve several stop names; the ones needing embeddings share one batched encode."""
+        return self.stop_name_resolver.resolve_many(
+            stop_names, embedding_search=lambda names: [top[0] for top in self.search_stops_batch(names, k=1)]
+        )
+
+    def get_stop_ids(self, stop_names: list, method='embedding_search') -> list:
+        """
+        Return one stop_id per name, resolving all names together.
+
+        Args:
+            stop_names: station/stop names.
+            method: 'embedding_search' encodes every name in one batched forward
+                pass and scores them with one matrix multiply; 'resolve' first
+                tries exact and fuzzy matching and batches only the leftovers.
+        """
+        if method == 'resolve':
+            return [result['stop_id'] for result in self.resolve_stops(stop_names)]
+        elif method == 'embedding_search':
+            return [top[0]['stop_id'] for top in self.search_stops_batch(stop_names, k=1)]
+        raise ValueError(f"Unsupported method for batched lookup: {method}")
+
+    def search_stops(self, stop_name: str, k=5) -> list:
+        """
+        Return the top-k stops most semantically similar to `stop_name`.
+
+        Scores all stops with a single matrix-vector product against the
+        normalized embedding matrix (cosine similarity).
+
+        Returns:
+            List of dicts with stop_id, stop_name and score, best match first.
+        """
+        return self.search_stops_batch([stop_name], k=k)[0]
+
+    def search_stops_batch(self, stop_names: list, k=5) -> list:
+        """Run `search_stops` for several names with one batched encode and one matrix multiply."""
+        if not stop_names:
+            return []
+        feed = self.feed
+        queries = normalize_rows(self.query_encodings.encode_many(stop_names))
+        scores = queries @ self._feed_embeddings(feed).T
+
+        k = min(k, scores.shape[1])
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+
+        stop_ids, names = feed.stops.stop_id.to_numpy(), feed.stops.stop_name.to_numpy()
+        return [
+            [
+                {'stop_id': stop_ids[i], 'stop_name': names[i], 'score': float(row_scores[i])}
+                for i in row_top
+            ]
+            for row_top, row_scores in zip(top, scores)
+        ]
+
+    def nearest_stops(self, lat: float, long: float, k=5) -> list:
+        """
+        Return the `k` stops nearest to a coordinate.
+
+        Returns:
+            List of dicts with stop_id, stop_name and distance_km, nearest first.
+        """
+        return self.stop_spatial_index.nearest(lat, long, k=k)
+
+    def stops_within(self, lat: float, long: float, radius_km: float) -> list:
+        """Return every stop within `radius_km` of a coordinate, nearest first; see `nearest_stops`."""
+        return self.stop_spatial_index.within(lat, long, radius_km)
+
     # ========================== Next Trip ==========================
 
-    def get_next_available_trip(self, o_stop_id: str, d_stop_id: str, time=None) -> dict:
+    def get_next_available_trip(self, o_stop_id: str, d_stop_id: str, time=None, date=None, corridor=None) -> dict:
+        """
+        Return the earliest trip leaving `o_stop_id` at or after `time` that later stops at `d_stop_id`.
+
+        Args:
+            o_stop_id, d_stop_id: origin and destination stop IDs.
+            time: query time (datetime, time, "HH:MM[:SS]" string, or None for now).
+            date: service date as YYYYMMDD or 'today'; defaults to the date of a datetime
+                `time`, otherwise `start_date`.
+            corridor: corridor code(s) to search; None searches every corridor.
+
+        Returns:
+            Dictionary with trip_id, origin, destination, departure_time, arrival_time
+            and usual_delay_minutes (typical historical delay, or None).
+        """
+        trips = self.get_next_available_trips(o_stop_id, d_stop_id, time=time, date=date, n=1, corridor=corridor)
+        if not trips:
+            raise ValueError(f"No trip found from {o_stop_id} to {d_stop_id} after {time or 'now'}.")
+        return trips[0]
+
+    def get_next_available_trips(self, o_stop_id: str, d_stop_id: str, time=None, date=None, n=3,
+                                 corridor=None) -> list:
+        """Return the next `n` departures from `o_stop_id` to `d_stop_id`; see `get_next_available_trip`."""
+        date = self._query_date(time, date)
+        after = parse_time_of_day(time)
+
+        # One feed for the whole query, even if a reload swaps it in between service days
+        feed = self.feed
+        key = feed.corridor_key(corridor)
+        found = []
+        for service_date, offset in self._service_days(date):
+            partition = feed.partition(key, service_date)
+            idx = partition.trip_index
+            found.extend(
+                (departure, {
+                    'trip_id': idx.trip_id_of(o_row),
+                    'origin': idx.stop_name_of(o_row),
+                    'destination': idx.stop_name_of(d_row),
+                    'departure_time': seconds_to_gtfs_time(idx.departure_seconds[o_row]),
+                    'arrival_time': seconds_to_gtfs_time(idx.arrival_seconds[d_row]),
+                    'usual_delay_minutes': self.usual_delay(idx.trip_id_of(o_row), o_stop_id, idx.departure_seconds[o_row]),
+                })
+                for departure, o_row, d_row in partition.pair_index.next_departures(
+                    o_stop_id, d_stop_id, after, offset=offset, n=n
+                )
+            )
+
+        found.sort(key=lambda item: item[0])
+        return [trip for _, trip in found[:n]]
+
+    def get_od_matrix(self, stop_ids: list, date=None, corridor=None) -> pd.DataFrame:
+        """
+        Count the trips serving each origin -> destination pair among `stop_ids` on a service date.
+
+        Returns:
+            DataFrame indexed by origin stop_id with one column per destination stop_id.
+        """
+        pair_index = self.partition(self._query_date(None, date), corridor).pair_index
+        return pd.DataFrame(
+            [[pair_index.count(o, d) for d in stop_ids] for o in stop_ids],
+            index=pd.Index(stop_ids, name='origin'), columns=pd.Index(stop_ids, name='destination'),
+        )
+
+    def get_distance_matrix(self, stop_ids: list, other_stop_ids: list = None, dtype=np.float32) -> pd.DataFrame:
+        """
+        Great-circle distances (km) between stops, e.g. for walking transfers.
+
+        Args:
+            stop_ids: row stops.
+            other_stop_ids: column stops; defaults to `stop_ids`.
+            dtype: np.float32 (default) or np.float64.
+
+        Returns:
+            DataFrame indexed by stop_id with one column per other stop_id;
+            unknown stops give NaN rows/columns.
+        """
+        other_stop_ids = stop_ids if other_stop_ids is None else other_stop_ids
+        coords = self.stops.drop_duplicates('stop_id').set_index('stop_id')[['stop_lat', 'stop_lon']]
+        a = coords.reindex(stop_ids).to_numpy(dtype=np.float64)
+        b = coords.reindex(other_stop_ids).to_numpy(dtype=np.float64)
+        return pd.DataFrame(
+            haversine_matrix(a[:, 0], a[:, 1], b[:, 0], b[:, 1], dtype=dtype),
+            index=pd.Index(stop_ids, name='stop_id'), columns=pd.Index(other_stop_ids, name='stop_id'),
+        )
+
+    def get_headways(self, line: str, stop_id=None, date=None, band=None, direction_id=None) -> list:
         """
-        Dummy lookup for next available trip between two stops.
+        Return how often a line runs, per direction and time band, from the scheduled stop times.
 
-        (Currently hardcoded — replace with real-time logic if needed.)
+        Args:
+            line: corridor code ('LE') or line name ('Lakeshore East').
+            stop_id: stop to report; None gives line-level figures from trip start times.
+            date: service date as YYYYMMDD or 'today'; defaults to `start_date`.
+            band: one of TIME_BANDS ('early', 'am_peak', 'midday', 'pm_peak',
+                'evening', 'night'); None returns every band.
+            direction_id: GTFS direction (0 or 1); None returns both.
+
+        Returns:
+            List of dicts with corridor, direction_id, direction, stop_id,
+            stop_name, band, departures, first/last departure and
+            median/mean/min/max headway in minutes. An unknown line raises
+            ValueError listing the valid line codes and names.
         """
+        names = {name.lower(): code for code, name in LINE_NAMES.items()}
+        corridor = names.get(str(line).strip().lower(), str(line).strip().upper())
+        if corridor not in self.corridors:
+            valid = ", ".join(f"{code} ({LINE_NAMES[code]})" if code in LINE_NAMES else code for code in self.corridors)
+            raise ValueError(f"Unknown line {line!r}; valid lines: {valid}.")
+
+        table = self.partition(self._query_date(None, date), corridor).headways
+        mask = (table.corridor == corridor) & (table.stop_id.isna() if stop_id is None else table.stop_id == stop_id)
+        if band is not None:
+            mask &= table.band == band
+        if direction_id is not None:
+            mask &= table.direction_id == int(direction_id)
+        return table[mask].round(1).astype(object).where(table[mask].notna(), None).to_dict(orient='records')
+
+    def get_stop_departures(self, stop_id: str, time=None, date=None, n=10, corridor=None) -> list:
+        """
+        Return the next `n` departures from `stop_id` on any trip, like a station departure board.
+
+        Args are as in `get_next_available_trip`. Each departure has trip_id,
+        stop_headsign, destination (the trip's last stop) and departure_time.
+        """
+        date = self._query_date(time, date)
+        after = parse_time_of_day(time)
+
+        feed = self.feed
+        key = feed.corridor_key(corridor)
+        found = []
+        for service_date, offset in self._service_days(date):
+            partition = feed.partition(key, service_date)
+            idx = partition.trip_index
+            for departure, row in partition.departure_index.departures_from(
+                stop_id, partition.services(offset), after, n=n
+            ):
+                trip = idx.row_trip[row]
+                found.append((departure, {
+                    'trip_id': idx.trip_ids[trip],
+                    'stop_headsign': idx.headsigns[trip],
+                    'destination': idx.stop_name_of(idx.ends[trip] - 1),
+                    'departure_time': seconds_to_gtfs_time(idx.departure_seconds[row]),
+                }))
+
+        found.sort(key=lambda item: item[0])
+        return [departure for _, departure in found[:n]]
+
+    # ========================== Journey Planner ==========================
+
+    def plan_journey(self, o_stop_id: str, d_stop_id: str, time=None, date=None, corridor=None) -> dict:
+        """
+        Plan the earliest-arrival journey between two stops, with transfers, from local GTFS data.
+
+        Args:
+            o_stop_id, d_stop_id: origin and destination stop IDs.
+            time, date, corridor: as in `get_next_available_trip`. Only trips of
+                the query's own service date are used.
+
+        Returns:
+            Dictionary with departure_time, arrival_time, transfers and a list of
+            legs; each leg has the trip_id, its boarding/alighting stops and times,
+            and its path: the trip's GTFS shape between the two stops, or the
+            coordinates of every stop it passes when the trip has no shape.
+            When both stops are the same the journey has no legs and departs
+            and arrives at the query time.
+        """
+        date = self._query_date(time, date)
+        after = parse_time_of_day(time)
+
+        partition = self.partition(date, corridor)
+        rows = partition.journey_planner.plan(o_stop_id, d_stop_id, partition.services(), after)
+        if rows is None:
+            raise ValueError(f"No journey found from {o_stop_id} to {d_stop_id} after {time or 'now'}.")
+
+        idx = partition.trip_index
+        if not rows:
+            # Origin and destination are the same stop: nothing to ride
+            name = idx.stop_names[idx.stop_codes_by_id[o_stop_id]]
+            return {
+                'origin': name,
+                'destination': name,
+                'departure_time': seconds_to_gtfs_time(after),
+                'arrival_time': seconds_to_gtfs_time(after),
+                'transfers': 0,
+                'legs': [],
+            }
+
+        legs = [
+            {
+                'trip_id': idx.trip_id_of(o_row),
+                'origin_id': idx.stop_id_of(o_row),
+                'origin': idx.stop_name_of(o_row),
+                'destination_id': idx.stop_id_of(d_row),
+                'destination': idx.stop_name_of(d_row),
+                'departure_time': seconds_to_gtfs_time(idx.departure_seconds[o_row]),
+                'arrival_time': seconds_to_gtfs_time(idx.arrival_seconds[d_row]),
+                'num_stops': int(d_row - o_row),
+                'path': partition.leg_path(o_row, d_row),
+            }
+            for o_row, d_row in rows
+        ]
+
         return {
-            'trip_id': '907',
-            'origin': 'Oshawa GO',
-            'destination': 'Union Station',
-            'departure_time': '07:42:00',
-            'arrival_time': '08:45:00',
+            'origin': legs[0]['origin'],
+            'destination': legs[-1]['destination'],
+            'departure_time': legs[0]['departure_time'],
+            'arrival_time': legs[-1]['arrival_time'],
+            'transfers': len(legs) - 1,
+            'legs': legs,
         }
 
+    def _query_date(self, time, date) -> int:
+        """
+        Resolve the service date of a query: explicit `date` ('today' for the
+        current date), else the date of a datetime `time`, else `start_date`.
+        """
+        if isinstance(date, str) and date.lower() == 'today':
+            date = datetime.date.today().strftime('%Y%m%d')
+        elif isinstance(date, (datetime.date, datetime.datetime)):
+            date = date.strftime('%Y%m%d')
+        elif date is None:
+            date = time.strftime('%Y%m%d') if isinstance(time, datetime.datetime) else self.start_date
+        return int(date)
+
+    def _service_days(self, date: int) -> list:
+        """
+        Return (service_date, offset) pairs to search for a query date.
+
+        The previous service day is included with a one-day offset to catch
+        its trips running past midnight.
+        """
+        day = datetime.date(date // 10000, date // 100 % 100, date % 100)
+        previous = day - datetime.timedelta(days=1)
+        return [(date, 0), (previous.year * 10000 + previous.month * 100 + previous.day, 86400)]
+
     # ========================== Station Alerts ==========================
 
     def get_station_alert(self, stop_id: str) -> str:
@@ -223,13 +1864,13 @@ class GoAPISimulator:
 
     @staticmethod
     def calculate_distance(lat1, lon1, lat2, lon2) -> float:
-        """Compute Haversine distance (in km) between two lat/lon points."""
-        r = 6371.0  # Earth radius in km
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-        return r * 2 * atan2(sqrt(a), sqrt(1 - a))
+        """
+        Compute Haversine distance (in km) between two lat/lon points.
 
+        For many points use `haversine_km` (one-to-many) or
+        `haversine_matrix` (many-to-many) instead of calling this per row.
+        """
+        return float(haversine_km(lat1, lon1, lat2, lon2))
 
 # ========================== Dev Testing ==========================
 if __name__ == '__main__':
@@ -0,0 +1,137 @@
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+
+# ========================== Connection Scan Planner ==========================
+
+class ConnectionScanPlanner:
+    """
+    Earliest-arrival journey planner using the Connection Scan Algorithm (CSA).
+
+    Every pair of consecutive stops on a trip is one "connection". Connections
+    are grouped by service_id and sorted by departure time, so a query scans a
+    single array once from the requested departure time and stops as soon as
+    no remaining connection can improve the arrival at the destination.
+    """
+
+    def __init__(self, trip_index, trips: pd.DataFrame, min_transfer_seconds=120):
+        """
+        Build the connection arrays from a TripIndex.
+
+        Args:
+            trip_index: `go_api_simu.TripIndex` with stop times sorted per trip.
+            trips: trips frame providing the service_id of each trip.
+            min_transfer_seconds: time needed to change trains at the same stop.
+        """
+        self.trip_index = trip_index
+        self.min_transfer_seconds = min_transfer_seconds
+
+        idx = trip_index
+        dep_rows = np.arange(len(idx.stop_codes) - 1)
+        same_trip = idx.row_trip[1:] == idx.row_trip[:-1]
+        dep_rows = dep_rows[same_trip]
+        arr_rows = dep_rows + 1
+
+        connections = pd.DataFrame({
+            'service_id': idx.trip_services(trips)[idx.row_trip[dep_rows]],
+            'departure': idx.departure_seconds[dep_rows],
+            'arrival': idx.arrival_seconds[arr_rows],
+            'trip': idx.row_trip[dep_rows],
+            'dep_row': dep_rows,
+            'arr_row': arr_rows,
+        })
+        connections = connections[
+            connections.service_id.notna() & (connections.departure >= 0) & (connections.arrival >= 0)
+        ].sort_values(['service_id', 'departure', 'arrival'], kind='stable')
+
+        self.by_service = {
+            service_id: group.drop(columns='service_id').reset_index(drop=True)
+            for service_id, group in connections.groupby('service_id', sort=False)
+        }
+        self._day_cache = {}
+
+    def _connections(self, services) -> dict:
+        """Merge the connections of the given (service_id, offset) pairs into plain sorted lists."""
+        key = tuple(services)
+        if key not in self._day_cache:
+            parts = [
+                self.by_service[service_id].assign(
+                    departure=lambda df, o=offset: df.departure - o,
+                    arrival=lambda df, o=offset: df.arrival - o,
+                )
+                for service_id, offset in services if service_id in self.by_service
+            ]
+            if parts:
+                merged = pd.concat(parts, ignore_index=True).sort_values('departure', kind='stable')
+            else:
+                merged = pd.DataFrame({col: np.empty(0, dtype=np.int64) for col in ('departure', 'arrival', 'trip', 'dep_row', 'arr_row')})
+
+            stop_codes = self.trip_index.stop_codes
+            conns = {col: merged[col].to_numpy() for col in merged.columns}
+            conns['dep_stop'] = stop_codes[conns['dep_row']].tolist()
+            conns['arr_stop'] = stop_codes[conns['arr_row']].tolist()
+            for col in ('departure', 'arrival', 'trip', 'dep_row', 'arr_row'):
+                conns[col] = conns[col].tolist()
+
+            if len(self._day_cache) >= 4:
+                self._day_cache.pop(next(iter(self._day_cache)))
+            self._day_cache[key] = conns
+        return self._day_cache[key]
+
+    def plan(self, o_stop_id, d_stop_id, services, after: int):
+        """
+        Find the earliest-arrival journey from `o_stop_id` to `d_stop_id`.
+
+        Args:
+            services: iterable of (service_id, offset) pairs active on the query date.
+            after: earliest departure, in seconds since midnight of the query date.
+
+        Returns:
+            List of (origin_row, destination_row) TripIndex row pairs, one per
+            trip ridden, or None when the destination is unreachable.
+        """
+        codes = self.trip_index.stop_codes_by_id
+        if o_stop_id not in codes or d_stop_id not in codes:
+            return None
+        o_stop_id, d_stop_id = codes[o_stop_id], codes[d_stop_id]
+        if o_stop_id == d_stop_id:
+            return []
+
+        conns = self._connections(services)
+        departure, arrival, trip = conns['departure'], conns['arrival'], conns['trip']
+        dep_stop, arr_stop = conns['dep_stop'], conns['arr_stop']
+
+        ready = {o_stop_id: after}   # earliest time a new trip can be boarded at a stop
+        arrived = {}                 # earliest arrival at a stop
+        boarded = {}                 # trip -> index of the connection where it was boarded
+        journey = {}                 # stop -> (boarding connection, alighting connection)
+
+        for k in range(bisect_left(departure, after), len(departure)):
+            dep_time = departure[k]
+            if arrived.get(d_stop_id, np.inf) <= dep_time:
+                break
+
+            t = trip[k]
+            if t not in boarded:
+                if ready.get(dep_stop[k], np.inf) > dep_time:
+                    continue
+                boarded[t] = k
+
+            stop = arr_stop[k]
+            if stop != o_stop_id and arrival[k] < arrived.get(stop, np.inf):
+                arrived[stop] = arrival[k]
+                ready[stop] = arrival[k] + self.min_transfer_seconds
+                journey[stop] = (boarded[t], k)
+
+        if d_stop_id not in journey:
+            return None
+
+        legs, stop = [], d_stop_id
+        while stop != o_stop_id:
+            enter, exit_ = journey[stop]
+            legs.append((conns['dep_row'][enter], conns['arr_row'][exit_]))
+            stop = dep_stop[enter]
+        legs.reverse()
+        return legs
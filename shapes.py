@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from geo import haversine_matrix, segment_lengths_km
+
+
+# ========================== Shapes Index ==========================
+
+SHAPE_DTYPES = {'shape_id': str, 'shape_pt_lat': np.float64, 'shape_pt_lon': np.float64, 'shape_pt_sequence': np.int64}
+
+
+class ShapeIndex:
+    """
+    GTFS shapes.txt as CSR arrays: the points of shape k are
+    `coords[starts[k]:ends[k]]`, ordered by shape_pt_sequence, with the
+    cumulative distance along the shape in `distances` (km).
+
+    Stops are located on a shape once per partition (`stop_offsets`), so the
+    geometry between any two stops of a trip is a plain slice.
+    """
+
+    ARRAYS = ('shape_ids', 'starts', 'ends', 'coords', 'distances')
+
+    def __init__(self, shapes: pd.DataFrame):
+        shapes = shapes.dropna(subset=['shape_pt_lat', 'shape_pt_lon'])
+        shapes = shapes.sort_values(['shape_id', 'shape_pt_sequence'], kind='stable')
+
+        shape_ids = shapes.shape_id.to_numpy(dtype=str)
+        boundaries = np.flatnonzero(shape_ids[1:] != shape_ids[:-1]) + 1
+        self.starts = np.r_[0, boundaries].astype(np.int64) if len(shapes) else np.empty(0, dtype=np.int64)
+        self.ends = np.r_[boundaries, len(shapes)].astype(np.int64) if len(shapes) else np.empty(0, dtype=np.int64)
+        self.shape_ids = shape_ids[self.starts]
+        self.coords = shapes[['shape_pt_lat', 'shape_pt_lon']].to_numpy(dtype=np.float64).reshape(-1, 2)
+
+        # Cumulative distance along each shape, restarting at 0 on every shape's first point
+        steps = np.r_[0.0, segment_lengths_km(self.coords)] if len(self.coords) else np.empty(0)
+        steps[self.starts] = 0.0
+        cumulative = np.cumsum(steps)
+        self.distances = cumulative - np.repeat(cumulative[self.starts], self.ends - self.starts)
+        self._index_shapes()
+
+    def _index_shapes(self) -> None:
+        self.codes_by_id = {shape_id: code for code, shape_id in enumerate(self.shape_ids.tolist())}
+
+    @classmethod
+    def from_feed(cls, data_dir: str) -> 'ShapeIndex':
+        """Read shapes.txt from a GTFS directory; a feed without one gives an empty index."""
+        path = os.path.join(data_dir, "shapes.txt")
+        if not os.path.exists(path):
+            return cls(pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in SHAPE_DTYPES.items()}))
+        return cls(pd.read_csv(path, usecols=list(SHAPE_DTYPES), dtype=SHAPE_DTYPES))
+
+    def to_arrays(self) -> dict:
+        """Return the index as plain arrays for `save_snapshot` (rebuilt by `from_arrays`)."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> 'ShapeIndex':
+        """Rebuild an index from `to_arrays` output, keeping the arrays as given (e.g. memory-mapped)."""
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index._index_shapes()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.shape_ids)
+
+    def __contains__(self, shape_id) -> bool:
+        return shape_id in self.codes_by_id
+
+    def points(self, shape_code: int, start=0, end=None) -> np.ndarray:
+        """Return the (lat, lon) points of a shape from point offset `start` to `end` inclusive (default: all)."""
+        first, last = int(self.starts[shape_code]), int(self.ends[shape_code])
+        end = last - first - 1 if end is None else end
+        return self.coords[first + start:first + end + 1]
+
+    def stop_offsets(self, trip_shapes: np.ndarray, row_trip: np.ndarray, stop_coords: np.ndarray) -> np.ndarray:
+        """
+        Locate each stop-time row on its trip's shape.
+
+        Every (shape, stop) pair is snapped once to the nearest shape point,
+        then offsets are made non-decreasing along each trip so a leg always
+        slices forward along the shape.
+
+        Args:
+            trip_shapes: shape code of each trip ordinal (-1 for no shape).
+            row_trip: trip ordinal of each stop-time row.
+            stop_coords: (lat, lon) of each stop-time row.
+
+        Returns:
+            int32 point offset within the shape of each row, -1 where the trip has no shape.
+        """
+        row_shapes = trip_shapes[row_trip] if len(row_trip) else np.empty(0, dtype=np.int32)
+        offsets = np.full(len(row_trip), -1, dtype=np.int32)
+        for code in np.unique(row_shapes[row_shapes >= 0]).tolist():
+            rows = np.flatnonzero(row_shapes == code)
+            stops, inverse = np.unique(stop_coords[rows], axis=0, return_inverse=True)
+            shape = self.points(code)
+            nearest = haversine_matrix(stops[:, 0], stops[:, 1], shape[:, 0], shape[:, 1]).argmin(axis=1)
+            offsets[rows] = nearest[inverse.reshape(-1)]
+
+        if len(offsets):
+            offsets = pd.Series(offsets).groupby(row_trip).cummax().to_numpy(dtype=np.int32)
+        return offsets
@@ -0,0 +1,201 @@
+import os
+import struct
+import hashlib
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+
+# ========================== Snapshot Cache ==========================
+
+SNAPSHOT_VERSION = 7
+GTFS_SOURCE_FILES = ("calendar.txt", "calendar_dates.txt", "trips.txt", "stop_times.txt", "stops.csv", "shapes.txt")
+OPTIONAL_GTFS_FILES = ("calendar.txt", "shapes.txt")
+
+
+def feed_fingerprint(data_dir: str, filenames=GTFS_SOURCE_FILES) -> str:
+    """
+    Fingerprint the source files (GTFS by default) from their names, sizes and modification times.
+
+    Stat-based rather than content-based so the check stays cheap on a full
+    network-wide stop_times.txt; replacing or editing any file changes the result.
+    Optional files (OPTIONAL_GTFS_FILES) that are absent are recorded as missing.
+    """
+    digest = hashlib.sha1(f"v{SNAPSHOT_VERSION}".encode())
+    for name in filenames:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path) and name in OPTIONAL_GTFS_FILES:
+            digest.update(f"{name}:missing".encode())
+            continue
+        stat = os.stat(path)
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+def snapshot_path(cache_dir: str, fingerprint: str, name: str) -> str:
+    """Return the snapshot file path for one feed fingerprint and snapshot name (e.g. "stops", "LE_20180301")."""
+    return os.path.join(cache_dir, f"{name}_{fingerprint}.npz")
+
+def _atomic_write(path: str, write) -> None:
+    """
+    Call `write(f)` on a temporary file next to `path`, then move it into place.
+
+    The temporary name is unique per call, so threads and processes writing the
+    same snapshot never share a half-written file; the last `os.replace` wins.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_snapshot(path: str, frames: dict, arrays: dict = None) -> None:
+    """
+    Write DataFrames (and optional raw arrays) to a single uncompressed .npz file.
+
+    Object columns are stored as fixed-width unicode with a separate null mask
+    and categoricals as integer codes plus their categories, so the file loads
+    without pickle. The write goes through a temp file and
+    os.replace, which keeps concurrent workers from reading a partial snapshot.
+    """
+    payload = {}
+    for name, df in frames.items():
+        payload[f"{name}@columns"] = np.array(df.columns, dtype=str)
+        for col in df.columns:
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                payload[f"{name}/{col}"] = values.cat.codes.to_numpy()
+                payload[f"{name}/{col}@categories"] = values.cat.categories.astype(str).to_numpy(dtype=str)
+            elif not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+                payload[f"{name}/{col}@na"] = values.isna().to_numpy()
+                payload[f"{name}/{col}"] = values.fillna("").astype(str).to_numpy(dtype=str)
+            else:
+                payload[f"{name}/{col}"] = values.to_numpy()
+    for name, arr in (arrays or {}).items():
+        payload[f"@{name}"] = arr
+
+    _atomic_write(path, lambda f: np.savez(f, **payload))
+
+def npz_memmaps(path: str) -> dict:
+    """
+    Memory-map every array stored uncompressed in an .npz file, keyed by member name.
+
+    `np.savez` writes each array as a plain .npy member, so its data sits at a
+    fixed offset in the file and can be mapped read-only in place. Processes
+    that map the same snapshot share its pages through the OS page cache
+    instead of each holding a private copy. Object arrays are skipped.
+    """
+    mapped = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith(".npy"):
+                continue
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                continue
+
+            key = info.filename[:-len(".npy")]
+            if int(np.prod(shape)) == 0:
+                mapped[key] = np.empty(shape, dtype=dtype)
+            else:
+                mapped[key] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                    order="F" if fortran_order else "C",
+                ).view(np.ndarray)
+    return mapped
+
+def load_snapshot(path: str, mmap: bool = False):
+    """
+    Load a snapshot written by `save_snapshot`.
+
+    With `mmap=True`, numeric columns, categorical codes and raw arrays are
+    read-only memory maps into the file (see `npz_memmaps`) rather than copies.
+
+    Returns:
+        Tuple of (frames, arrays) dictionaries.
+    """
+    frames, arrays = {}, {}
+    with np.load(path, allow_pickle=False) as npz:
+        mapped = npz_memmaps(path) if mmap else {}
+
+        def read(key):
+            return mapped[key] if key in mapped else npz[key]
+
+        keys = set(npz.files)
+        for key in keys:
+            if key.startswith("@"):
+                arrays[key[1:]] = read(key)
+            elif key.endswith("@columns"):
+                name = key[:-len("@columns")]
+                columns = {}
+                for col in npz[key].tolist():
+                    values = read(f"{name}/{col}")
+                    if f"{name}/{col}@categories" in keys:
+                        values = pd.Categorical.from_codes(values, npz[f"{name}/{col}@categories"])
+                    elif f"{name}/{col}@na" in keys:
+                        values = pd.Series(values, dtype=object)
+                        values[npz[f"{name}/{col}@na"]] = None
+                    columns[col] = values
+                frames[name] = pd.DataFrame(columns, copy=False)
+    return frames, arrays
+
+def embeddings_path(snapshot_file: str, variant: str = None) -> str:
+    """
+    Return the memory-mappable stop-embedding matrix path that sits next to a snapshot.
+
+    `variant` distinguishes matrices regenerated for a non-default embedding model.
+    """
+    suffix = f"_embeddings_{variant}.npy" if variant else "_embeddings.npy"
+    return snapshot_file[:-len(".npz")] + suffix
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a float32 copy of `matrix` with every row scaled to unit L2 norm."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def save_matrix(path: str, matrix: np.ndarray) -> None:
+    """Atomically write a single array as `.npy` so it can be memory-mapped by other workers."""
+    _atomic_write(path, lambda f: np.save(f, matrix))
+
+def frames_digest(*frames: pd.DataFrame) -> str:
+    """Content hash of DataFrames (values and column names, not row order labels) for change detection."""
+    digest = hashlib.sha1()
+    for df in frames:
+        digest.update(",".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def arrays_digest(arrays: dict) -> str:
+    """Content hash of named arrays (e.g. a `to_arrays` result) for change detection."""
+    digest = hashlib.sha1()
+    for name in sorted(arrays):
+        digest.update(f"{name}:{arrays[name].dtype}:{arrays[name].shape}".encode())
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return digest.hexdigest()[:16]
+
+def prune_snapshots(cache_dir: str, fingerprint: str) -> None:
+    """Delete snapshot files built from any feed fingerprint other than `fingerprint`."""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith((".npz", ".npy")) and f"_{fingerprint}" not in name:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
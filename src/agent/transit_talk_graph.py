@@ -25,6 +25,7 @@ from tools import (
     get_go_transit_policy_docs,
     get_all_go_transit_alert,
     get_go_transit_trip_updates,
+    get_service_frequency,
 )
 
 import uuid
@@ -102,7 +103,7 @@ class Assistant:
 llm = init_chat_model("openai:gpt-4o-mini")
 
 assistant_prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful customer service assistant for public transit travel. Use the provided tools to search the trip information based on the given origin and destination. If the user asks about the weather, use the weather tool to get the weather information. If the user asks about the current time, use the current time tool to get the current time. If the user asks about the go-transit policy related questions, use the policy tool to get the policy information. When searching, be persistent. Expand your query bounds if the first search returns no results. "
+    ("system", "You are a helpful customer service assistant for public transit travel. Use the provided tools to search the trip information based on the given origin and destination. If the user asks about the weather, use the weather tool to get the weather information. If the user asks about the current time, use the current time tool to get the current time. If the user asks about the go-transit policy related questions, use the policy tool to get the policy information. If the user asks how often a GO train line runs, use the service frequency tool. When searching, be persistent. Expand your query bounds if the first search returns no results. "
             " If a search comes up empty, expand your search before giving up."
             "\nCurrent time: {time}.",
         ),
@@ -110,7 +111,7 @@ assistant_prompt = ChatPromptTemplate.from_messages([
     ]
 ).partial(time=datetime.now)
 
-tools = [get_route, get_weather, get_current_time, get_go_transit_policy_docs]
+tools = [get_route, get_weather, get_current_time, get_go_transit_policy_docs, get_service_frequency]
 
 trip_advisor_runnable = assistant_prompt | llm.bind_tools(tools) 
 
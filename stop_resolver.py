@@ -0,0 +1,126 @@
+import re
+from collections import Counter
+
+import pandas as pd
+
+
+# ========================== Stop Name Resolver ==========================
+
+GENERIC_STOP_WORDS = {'go', 'station', 'stn', 'train', 'bus', 'terminal', 'the'}
+
+
+def normalize_stop_name(name: str) -> str:
+    """Lowercase a stop name, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(name).lower()).split())
+
+def name_trigrams(name: str) -> set:
+    """Return the padded character trigrams of a normalized name."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StopNameResolver:
+    """
+    Resolve free-text stop names in tiers, cheapest first.
+
+    1. exact: normalized name (or the name without generic words such as
+       "GO" or "Station", when that is unambiguous) in a hash map.
+    2. fuzzy: trigram inverted index scored by Dice similarity.
+    3. embedding: the caller's semantic search, used only when the fuzzy
+       score is below `min_fuzzy_score`.
+    """
+
+    def __init__(self, stops: pd.DataFrame, min_fuzzy_score=0.6):
+        self.min_fuzzy_score = min_fuzzy_score
+        self.stop_ids = stops.stop_id.to_numpy()
+        self.stop_names = stops.stop_name.to_numpy()
+
+        self.exact = {}
+        core_names = {}
+        for pos, name in enumerate(self.stop_names):
+            norm = normalize_stop_name(name)
+            self.exact.setdefault(norm, pos)
+            core = " ".join(w for w in norm.split() if w not in GENERIC_STOP_WORDS)
+            if core and core != norm:
+                core_names.setdefault(core, set()).add(pos)
+        for core, positions in core_names.items():
+            if len(positions) == 1 and core not in self.exact:
+                self.exact[core] = positions.pop()
+
+        self.aliases = list(self.exact.items())
+        self.alias_sizes = []
+        self.postings = {}
+        for alias_id, (alias, _) in enumerate(self.aliases):
+            grams = name_trigrams(alias)
+            self.alias_sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(alias_id)
+
+    def _record(self, pos: int, score: float, tier: str) -> dict:
+        return {
+            'stop_id': self.stop_ids[pos],
+            'stop_name': self.stop_names[pos],
+            'score': float(score),
+            'tier': tier,
+        }
+
+    def fuzzy(self, stop_name: str):
+        """Return the best trigram match as (position, Dice score), or None if nothing overlaps."""
+        grams = name_trigrams(normalize_stop_name(stop_name))
+        shared = Counter(alias_id for gram in grams for alias_id in self.postings.get(gram, ()))
+        if not shared:
+            return None
+        alias_id, score = max(
+            ((a, 2 * n / (len(grams) + self.alias_sizes[a])) for a, n in shared.items()),
+            key=lambda item: item[1],
+        )
+        return self.aliases[alias_id][1], score
+
+    def _resolve_by_name(self, stop_name: str, accept_any=False):
+        """Try the exact and fuzzy tiers; return a result dict, or None if neither is confident."""
+        norm = normalize_stop_name(stop_name)
+        pos = self.exact.get(norm)
+        if pos is None:
+            core = " ".join(w for w in norm.split() if w not in GENERIC_STOP_WORDS)
+            pos = self.exact.get(core)
+        if pos is not None:
+            return self._record(pos, 1.0, 'exact')
+
+        match = self.fuzzy(stop_name)
+        if match is not None and (match[1] >= self.min_fuzzy_score or accept_any):
+            return self._record(match[0], match[1], 'fuzzy')
+        return None
+
+    def resolve(self, stop_name: str, embedding_search=None) -> dict:
+        """
+        Resolve `stop_name` to a stop, reporting which tier answered.
+
+        Args:
+            embedding_search: optional callable(stop_name) returning a dict with
+                stop_id, stop_name and score, used as the last tier.
+
+        Returns:
+            Dict with stop_id, stop_name, score and tier ('exact', 'fuzzy' or 'embedding').
+        """
+        if embedding_search is None:
+            return self.resolve_many([stop_name])[0]
+        return self.resolve_many([stop_name], lambda names: [embedding_search(name) for name in names])[0]
+
+    def resolve_many(self, stop_names: list, embedding_search=None) -> list:
+        """
+        Resolve several names at once; names left unresolved by the cheap tiers share one embedding call.
+
+        Args:
+            embedding_search: optional callable(list of names) returning one
+                result dict per name, used as the last tier.
+        """
+        results = [self._resolve_by_name(name, accept_any=embedding_search is None) for name in stop_names]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if pending and embedding_search is None:
+            raise ValueError(f"Stop not found: {stop_names[pending[0]]}")
+        if pending:
+            matches = embedding_search([stop_names[i] for i in pending])
+            for i, match in zip(pending, matches):
+                results[i] = {**match, 'tier': 'embedding'}
+        return results
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from go_api_simu import GoAPISimulator, GtfsFeed
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "gtfs")
+DELAY_LOG_DIR = os.path.join(os.path.dirname(__file__), "data", "delay_logs")
+THURSDAY = 20180301
+
+
+@pytest.fixture
+def feed(tmp_path):
+    return GtfsFeed(DATA_DIR, str(tmp_path), use_snapshot=True)
+
+
+@pytest.fixture
+def partition(feed):
+    return feed.partition(feed.corridor_key(None), THURSDAY)
+
+
+@pytest.fixture
+def simulator(tmp_path):
+    return GoAPISimulator(
+        data_dir=DATA_DIR, cache_dir=str(tmp_path), delay_log_dir=DELAY_LOG_DIR,
+        start_date=THURSDAY, end_date=20180308,
+    )
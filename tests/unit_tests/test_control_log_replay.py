@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+import go_api_simu
+
+
+class FakeClock:
+    """Stand-in for time.monotonic / time.sleep that advances only when slept."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(go_api_simu, "monotonic", clock.monotonic)
+    monkeypatch.setattr(go_api_simu, "sleep", clock.sleep)
+    return clock
+
+
+def test_replay_in_time_order_with_compact_events(simulator, clock):
+    events = list(simulator.replay_control_logs(speedup=None, fields=["StationCode"]))
+
+    assert [event["trip_id"] for event in events] == [1, 2, 3, 6, 7, 8]  # LE logs with a delay code
+    assert events[0] == {
+        "timestamp": "2018-03-01 07:21:00", "trip_id": 1, "corridor": "LE", "delay_code": "SIG",
+        "StationCode": "PIN", "lag_seconds": 0.0,
+    }
+    assert clock.sleeps == []
+
+
+def test_replay_paces_by_speedup(simulator, clock):
+    events = list(simulator.replay_control_logs(speedup=60, start="2018-03-05", end="2018-03-06"))
+
+    # 07:24 -> 07:30 is six log-minutes, i.e. six seconds at 60x
+    assert [event["timestamp"] for event in events] == ["2018-03-05 07:24:00", "2018-03-05 07:30:00"]
+    assert clock.sleeps == [6.0]
+    assert all(event["lag_seconds"] == 0.0 for event in events)
+
+
+def test_replay_reports_lag_of_a_slow_consumer(simulator, clock):
+    lags = []
+    for event in simulator.replay_control_logs(speedup=60, start="2018-03-05", end="2018-03-06"):
+        lags.append(event["lag_seconds"])
+        clock.now += 10  # consumer takes 10 s per event
+
+    assert lags == [0.0, 4.0]
+
+
+def test_async_replay_matches_sync(simulator, clock):
+    async def collect():
+        return [event async for event in simulator.areplay_control_logs(speedup=None)]
+
+    assert asyncio.run(collect()) == list(simulator.replay_control_logs(speedup=None))
@@ -0,0 +1,59 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delay_logs import DelayLogIndex
+
+
+@pytest.fixture
+def logs():
+    rng = np.random.default_rng(0)
+    times = pd.Timestamp("2018-03-01") + pd.to_timedelta(np.sort(rng.integers(0, 3 * 86400, 200)), unit="s")
+    return pd.DataFrame({
+        "OperationDateTime": times,
+        "CorridorId": rng.choice(["LE", "LW", "BR"], 200),
+        "StationCode": rng.choice(["UN", "PIN", "OS"], 200),
+        "DelayCode": rng.choice(["SIG", "MW", "TRF"], 200),
+    })
+
+
+def brute_force(logs, start, end, corridor=None, station=None, delay_code=None):
+    mask = np.ones(len(logs), dtype=bool)
+    if start is not None:
+        mask &= logs.OperationDateTime >= pd.Timestamp(start)
+    if end is not None:
+        mask &= logs.OperationDateTime < pd.Timestamp(end)
+    for col, value in (("CorridorId", corridor), ("StationCode", station), ("DelayCode", delay_code)):
+        if value is not None:
+            mask &= logs[col] == value
+    return np.flatnonzero(mask).tolist()
+
+
+def test_query_matches_boolean_scan(logs):
+    index = DelayLogIndex(logs)
+    windows = [(None, None), ("2018-03-01 07:00", "2018-03-01 09:00"), ("2018-03-02", None), (None, "2018-03-02")]
+    for (start, end), corridor, station in itertools.product(windows, (None, "LE"), (None, "PIN")):
+        expected = brute_force(logs, start, end, corridor=corridor, station=station)
+        assert index.query(start, end, corridor=corridor, station=station).tolist() == expected
+    assert index.query("2018-03-01", "2018-03-04", corridor="LW", station="OS", delay_code="MW").tolist() == \
+        brute_force(logs, "2018-03-01", "2018-03-04", corridor="LW", station="OS", delay_code="MW")
+
+
+def test_query_empty_results(logs):
+    index = DelayLogIndex(logs)
+    assert index.query("2018-03-02", "2018-03-01").tolist() == []
+    assert index.query(corridor="ST").tolist() == []
+    with pytest.raises(KeyError):
+        DelayLogIndex(logs.drop(columns=["StationCode"])).query(station="UN")
+
+
+def test_unsorted_logs_raise(logs):
+    with pytest.raises(ValueError, match="sorted"):
+        DelayLogIndex(logs.iloc[::-1])
+
+
+def test_simulator_delay_log_window(simulator):
+    logs = simulator.get_delay_logs("2018-03-01 07:00", "2018-03-01 09:00", station="PIN")
+    assert logs.TripNumber.tolist() == [900, 904]
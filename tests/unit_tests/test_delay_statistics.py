@@ -0,0 +1,62 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delay_logs import DelayStatistics, delay_log_key, delay_log_keys
+
+
+@pytest.fixture
+def logs():
+    return pd.DataFrame({
+        # float64 after a left join left an unmatched trip number missing
+        "TripNumber": [900.0, 900.0, 902.0, np.nan],
+        "StationCode": ["PIN", "OS", "PIN", "DA"],
+        "OperationDateTime": pd.to_datetime(["2018-03-01 07:21", "2018-03-05 07:30", "2018-03-01 08:05",
+                                             "2018-03-01 08:10"]),
+        "DelayMinutes": [4.0, 8.0, 12.0, 1.0],
+        "DelayCode": ["SIG", "SIG", "MW", "TRF"],
+    })
+
+
+def test_scalar_keys_match_vectorized_keys():
+    values = pd.Series([900.0, 1900.0, np.nan])
+    assert [delay_log_key(v) for v in values] == delay_log_keys(values).tolist() == ["900", "1900", None]
+    assert delay_log_key(1900.5) == "1900.5"
+    assert delay_log_key(900) == delay_log_key("900") == delay_log_key(np.float32(900)) == "900"
+
+
+def test_lookup_with_float_trip_numbers(logs):
+    stats = DelayStatistics(logs)
+
+    for key in (900, "900", 900.0):
+        assert stats.lookup("trip", key) == {"count": 2, "p50": 6.0, "p90": pytest.approx(7.6),
+                                             "p99": pytest.approx(7.96), "delay_codes": {"SIG": 1.0}}
+    assert stats.lookup("trip", 901) is None
+    assert stats.lookup("hour", 8)["count"] == 2
+    assert stats.usual_delay(trip="999", station="PIN") == 8.0
+
+
+def test_missing_default_column_is_skipped_with_warning(logs, caplog):
+    with caplog.at_level(logging.WARNING, logger="delay_logs"):
+        stats = DelayStatistics(logs.drop(columns=["StationCode", "DelayCode"]))
+
+    assert "StationCode" in caplog.text and "DelayCode" in caplog.text
+    assert set(stats.tables) == {"trip", "hour"}
+    assert stats.lookup("station", "PIN") is None
+    assert stats.lookup("trip", 902)["delay_codes"] == {}
+
+
+def test_missing_explicit_column_raises(logs):
+    with pytest.raises(ValueError, match="Station"):
+        DelayStatistics(logs, station_col="Station")
+    with pytest.raises(ValueError):
+        DelayStatistics(logs, delay_col=None)
+    with pytest.raises(TypeError):
+        DelayStatistics(logs, stop_col="StationCode")
+
+
+def test_renamed_columns(logs):
+    stats = DelayStatistics(logs.rename(columns={"DelayMinutes": "MinutesLate"}), delay_col="MinutesLate")
+    assert stats.lookup("station", "PIN")["count"] == 2
@@ -0,0 +1,68 @@
+import numpy as np
+
+from encoding_cache import EncodingCache
+
+
+class FakeEncoder:
+    """Deterministic stand-in for SentenceTransformer.encode that records its calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(texts)
+        if isinstance(texts, str):
+            return np.array([len(texts), ord(texts[0])], dtype=np.float32)
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+
+
+def test_hits_misses_and_key_normalization():
+    encoder = FakeEncoder()
+    cache = EncodingCache(encoder, maxsize=4)
+
+    first = cache.encode("Union  Station")
+    second = cache.encode("union station")
+
+    np.testing.assert_array_equal(first, second)
+    assert len(encoder.calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    encoder = FakeEncoder()
+    cache = EncodingCache(encoder, maxsize=2)
+
+    cache.encode("a")
+    cache.encode("b")
+    cache.encode("a")  # "b" is now least recently used
+    cache.encode("c")
+
+    assert list(cache.entries) == ["a", "c"]
+    cache.encode("b")
+    assert cache.stats()["misses"] == 4
+
+
+def test_encode_many_batches_distinct_misses():
+    encoder = FakeEncoder()
+    cache = EncodingCache(encoder)
+    cache.encode("union")
+
+    vectors = cache.encode_many(["Union", "oshawa", "OSHAWA", "ajax"])
+
+    assert vectors.shape == (4, 2)
+    assert encoder.calls[-1] == ["oshawa", "ajax"]
+    np.testing.assert_array_equal(vectors[1], vectors[2])
+
+
+def test_disk_store_survives_restart_and_is_namespaced(tmp_path):
+    path = str(tmp_path / "encodings.sqlite")
+    EncodingCache(FakeEncoder(), path=path, namespace="model-a").encode("union")
+
+    encoder = FakeEncoder()
+    restarted = EncodingCache(encoder, path=path, namespace="model-a")
+    restarted.encode("union")
+    assert encoder.calls == [] and restarted.stats()["disk_hits"] == 1
+
+    other_model = EncodingCache(encoder, path=path, namespace="model-b")
+    other_model.encode("union")
+    assert encoder.calls == ["union"]
@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo import EARTH_RADIUS_KM, StopSpatialIndex, haversine_km, haversine_matrix, path_length_km
+
+POINTS = np.array([
+    (43.6453, -79.3806),   # Union
+    (43.8707, -78.8848),   # Oshawa
+    (43.6361, -79.4185),   # Exhibition
+    (43.4553, -79.6828),   # Oakville
+    (43.6453, -79.3806),   # Union again: zero distance
+])
+
+
+def reference_km(lat1, lon1, lat2, lon2):
+    """Scalar haversine, written out independently of geo.py."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+REFERENCE = np.array([[reference_km(*p, *q) for q in POINTS] for p in POINTS])
+
+
+def test_one_to_many_matches_scalar_formula():
+    distances = haversine_km(*POINTS[0], POINTS[:, 0], POINTS[:, 1])
+
+    np.testing.assert_allclose(distances, REFERENCE[0], atol=1e-9)
+    assert distances[4] == 0.0 and 46 < distances[1] < 48  # Union to Oshawa is about 47 km as the crow flies
+
+
+def test_matrix_matches_scalar_formula_for_any_chunk_size():
+    for chunk_rows in (1, 2, 3, 2048):
+        np.testing.assert_allclose(
+            haversine_matrix(POINTS[:, 0], POINTS[:, 1], chunk_rows=chunk_rows), REFERENCE, atol=1e-9
+        )
+    rectangular = haversine_matrix(POINTS[:2, 0], POINTS[:2, 1], POINTS[:, 0], POINTS[:, 1])
+    np.testing.assert_allclose(rectangular, REFERENCE[:2], atol=1e-9)
+
+
+def test_float32_within_a_few_metres():
+    matrix = haversine_matrix(POINTS[:, 0], POINTS[:, 1], dtype=np.float32)
+    distances = haversine_km(*POINTS[0], POINTS[:, 0], POINTS[:, 1], dtype=np.float32)
+
+    assert matrix.dtype == distances.dtype == np.float32
+    np.testing.assert_allclose(matrix, REFERENCE, atol=5e-3)
+    np.testing.assert_allclose(distances, REFERENCE[0], atol=5e-3)
+
+
+def test_path_length():
+    assert path_length_km(POINTS[:4]) == pytest.approx(REFERENCE[0, 1] + REFERENCE[1, 2] + REFERENCE[2, 3])
+    assert path_length_km([POINTS[0]]) == 0.0
+    assert path_length_km([]) == 0.0
+
+
+def test_spatial_index_nearest_and_within():
+    stops = pd.DataFrame({
+        "stop_id": ["UN", "OS", "EX", "OA", "XX"],
+        "stop_name": ["Union", "Oshawa", "Exhibition", "Oakville", "No coordinates"],
+        "stop_lat": [*POINTS[:4, 0], np.nan],
+        "stop_lon": [*POINTS[:4, 1], np.nan],
+    })
+    index = StopSpatialIndex(stops)
+
+    nearest = index.nearest(43.64, -79.40, k=2)
+    assert [stop["stop_id"] for stop in nearest] == ["EX", "UN"]
+    assert nearest[0]["distance_km"] == pytest.approx(reference_km(43.64, -79.40, *POINTS[2]), rel=1e-6)
+    assert [stop["stop_id"] for stop in index.within(*POINTS[0], radius_km=10)] == ["UN", "EX"]
+    assert len(index.nearest(43.64, -79.40, k=10)) == 4  # the stop without coordinates is not indexed
@@ -0,0 +1,80 @@
+import datetime
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from go_api_server import OpenDataEmulator, make_server
+
+MONDAY_0735 = datetime.datetime(2018, 3, 5, 7, 35)
+
+
+@pytest.fixture
+def emulator(simulator):
+    return OpenDataEmulator(simulator, clock=MONDAY_0735, alert_window_minutes=60)
+
+
+def test_next_service(emulator):
+    status, payload = emulator.handle("/OpenDataAPI/api/V1/Stop/NextService/UN?key=test")
+
+    assert status == 200
+    lines = payload["NextService"]["Lines"]
+    assert [line["TripNumber"] for line in lines] == ["902", "904", "906"]
+    assert lines[0]["ScheduledDepartureTime"] == "2018-03-05 08:00:00"
+    assert lines[2]["ScheduledDepartureTime"] == "2018-03-06 00:30:00"  # 24:30 of the Monday service day
+
+
+def test_journey_schedule(emulator):
+    status, payload = emulator.handle("api/V1/Schedule/Journey/20180305/UN/OS/0805/2")
+
+    services = payload["SchedJourneys"][0]["Services"]
+    assert status == 200 and payload["Metadata"]["ErrorCode"] == "200"
+    assert [(s["StartTime"], s["Trips"]["Trip"][0]["Number"]) for s in services] == [("2018-03-05 08:10:00", "904")]
+
+
+def test_delay_feeds_use_integer_trip_numbers_and_tolerate_missing_delay(emulator):
+    # TripNumber is float64 in the fixture logs: one row lacks it
+    assert emulator.simulator.delay_logs_clean_df.TripNumber.dtype == float
+
+    alerts = emulator.handle("api/V1/ServiceUpdate/ServiceAlert/All")[1]["Messages"]["Message"]
+    assert [alert["SubjectEnglish"] for alert in alerts] == ["Trip 900 delayed", "Trip 900 delayed"]
+
+    updates = emulator.handle("api/V1/Fleet/Occupancy/GtfsRT/Feed/TripUpdates")[1]["entity"]
+    assert [(u["trip_update"]["trip"]["trip_id"], u["trip_update"]["delay"]) for u in updates] == [
+        ("20180305-LE-900", 0),  # DelayMinutes is missing on this log
+        ("20180305-LE-900", 540),
+    ]
+
+
+def test_unknown_resource(emulator):
+    status, payload = emulator.handle("api/V1/Fleet/Consist/All")
+    assert status == 404 and payload["Metadata"]["ErrorCode"] == "404"
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(emulator, **kwargs):
+        server = make_server(emulator, port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/OpenDataAPI/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_round_trip_and_error_injection(emulator, serve):
+    base_url = serve(emulator)
+    with urllib.request.urlopen(base_url + "api/V1/Stop/Details/PIN?key=test") as response:
+        assert json.load(response)["Stop"]["StopName"] == "Pickering GO"
+
+    failing_url = serve(emulator, error_rate=1.0, error_statuses=(503,), seed=0)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(failing_url + "api/V1/Stop/All")
+    assert error.value.code == 503
@@ -0,0 +1,26 @@
+import pandas as pd
+
+
+def headway_row(table, stop_id, band, corridor="LE", direction_id=0):
+    rows = table[(table.corridor == corridor) & (table.direction_id == direction_id) & (table.band == band)]
+    rows = rows[rows.stop_id.isna()] if stop_id is None else rows[rows.stop_id == stop_id]
+    assert len(rows) == 1
+    return rows.iloc[0]
+
+
+def test_headways_within_a_band(partition):
+    row = headway_row(partition.headways, "UN", "am_peak")
+
+    # 07:00, 08:00 and 08:10 out of Union
+    assert (row.departures, row.first_departure, row.last_departure) == (3, "07:00:00", "08:10:00")
+    assert (row.min_headway_min, row.median_headway_min, row.max_headway_min) == (10.0, 35.0, 60.0)
+
+
+def test_gaps_do_not_span_bands(partition):
+    table = partition.headways
+
+    # 24:30 is the only night departure; its 16h20 gap back to 08:10 is not a headway
+    night = headway_row(table, "UN", "night")
+    assert night.departures == 1 and pd.isna(night.median_headway_min)
+    assert headway_row(table, None, "night").departures == 1
+    assert table.max_headway_min.max() <= 60.0
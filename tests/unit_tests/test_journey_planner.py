@@ -0,0 +1,48 @@
+import pytest
+
+def plan_trip_ids(partition, o_stop_id, d_stop_id, after):
+    rows = partition.journey_planner.plan(o_stop_id, d_stop_id, partition.services(), after)
+    if rows is None:
+        return None
+    idx = partition.trip_index
+    return [(idx.trip_id_of(o_row), idx.stop_id_of(o_row), idx.stop_id_of(d_row)) for o_row, d_row in rows]
+
+
+def test_plan_earliest_arrival(partition):
+    assert plan_trip_ids(partition, "UN", "OS", 8 * 3600) == [("WKDY-LE-902", "UN", "OS")]
+    # 902 has left; the express 904 is the only way to Oshawa
+    assert plan_trip_ids(partition, "UN", "OS", 8 * 3600 + 60) == [("WKDY-LE-904", "UN", "OS")]
+
+
+def test_plan_with_transfer(partition):
+    assert plan_trip_ids(partition, "EX", "OS", 6 * 3600 + 30 * 60) == [
+        ("WKDY-LW-1900", "EX", "UN"),
+        ("WKDY-LE-900", "UN", "OS"),
+    ]
+
+
+def test_plan_transfer_needs_minimum_connection_time(partition):
+    partition.journey_planner.min_transfer_seconds = 11 * 60
+    assert plan_trip_ids(partition, "EX", "OS", 6 * 3600 + 30 * 60) == [
+        ("WKDY-LW-1900", "EX", "UN"),
+        ("WKDY-LE-902", "UN", "OS"),
+    ]
+
+
+def test_plan_same_stop_and_unreachable(partition):
+    assert plan_trip_ids(partition, "UN", "UN", 0) == []
+    assert plan_trip_ids(partition, "OS", "EX", 0) is None
+    assert plan_trip_ids(partition, "UN", "NOPE", 0) is None
+
+
+def test_plan_journey_same_stop_has_no_legs(simulator):
+    journey = simulator.plan_journey("UN", "UN", time="08:00", date=20180301)
+
+    assert journey["legs"] == [] and journey["transfers"] == 0
+    assert journey["departure_time"] == journey["arrival_time"] == "08:00:00"
+    assert journey["origin"] == journey["destination"]
+
+
+def test_plan_journey_unreachable_raises(simulator):
+    with pytest.raises(ValueError, match="No journey found"):
+        simulator.plan_journey("OS", "EX", time="00:00", date=20180301)
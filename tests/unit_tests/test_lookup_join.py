@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from delay_logs import lookup_join
+
+LEFT = pd.DataFrame({"k": [1.0, np.nan, 2.0, 3.0, 1.0], "x": [1, 2, 3, 4, 5], "y": list("abcde")})
+
+
+@pytest.mark.parametrize("right", [
+    pd.DataFrame({"k": [1.0, 2.0], "y": [10, 20], "z": ["p", "q"]}),
+    pd.DataFrame({"k": [1.0, np.nan], "y": [10, 30], "z": ["p", "r"]}),       # null matches null
+    pd.DataFrame({"k": [np.nan, 3.0, 1.0], "y": [30, 40, 10], "z": ["r", "s", "p"]}),
+    pd.DataFrame({"k": [1.0, np.nan, np.nan], "y": [10, 30, 31], "z": ["p", "r", "t"]}),  # falls back to merge
+    pd.DataFrame({"k": [1.0, 1.0], "y": [10, 11], "z": ["p", "q"]}),
+    pd.DataFrame({"k": pd.Series([], dtype=float), "y": pd.Series([], dtype=int), "z": pd.Series([], dtype=object)}),
+])
+def test_matches_pd_merge(right):
+    expected = pd.merge(LEFT, right, on="k", how="left")
+    joined = lookup_join(LEFT, right, "k")
+
+    assert list(joined.columns) == list(expected.columns)
+    for col in expected.columns:
+        assert joined[col].astype(object).where(joined[col].notna(), None).tolist() == \
+            expected[col].astype(object).where(expected[col].notna(), None).tolist(), col
+
+
+def test_string_keys_with_null_left_rows():
+    left = pd.DataFrame({"code": ["SIG", None, "MW"]})
+    right = pd.DataFrame({"code": ["MW", "SIG"], "description": ["Mechanical", "Signal"]})
+
+    assert lookup_join(left, right, "code").description.tolist()[::2] == ["Signal", "Mechanical"]
+    assert pd.isna(lookup_join(left, right, "code").description[1])
@@ -0,0 +1,34 @@
+import itertools
+
+import numpy as np
+
+from conftest import THURSDAY
+from go_api_simu import GtfsFeed, ServicePartition
+from snapshots import load_snapshot, save_snapshot
+
+
+def test_partition_reattached_from_mmap_snapshot(feed, partition, tmp_path):
+    path = str(tmp_path / "partition.npz")
+    save_snapshot(path, {"trips": partition.trips}, partition.to_arrays())
+    frames, arrays = load_snapshot(path, mmap=True)
+    restored = ServicePartition(
+        partition.corridors, THURSDAY, frames["trips"], None, feed.stops, arrays=arrays, shapes=feed.shapes
+    )
+
+    assert restored.digest == partition.digest
+    for o_stop_id, d_stop_id in itertools.permutations(partition.trip_index.stop_ids.tolist(), 2):
+        assert restored.pair_index.next_departures(o_stop_id, d_stop_id, 0, n=10) == \
+            partition.pair_index.next_departures(o_stop_id, d_stop_id, 0, n=10)
+    assert restored.leg_path(0, 4) == partition.leg_path(0, 4)
+
+
+def test_feed_restart_attaches_index_snapshot(feed, partition):
+    restarted = GtfsFeed(feed.data_dir, feed.cache_dir, use_snapshot=True)
+    attached = restarted.partition(restarted.corridor_key(None), THURSDAY)
+
+    assert attached.digest == partition.digest
+    assert isinstance(attached.trip_index.departure_seconds.base, np.memmap)  # index arrays are mapped, not rebuilt
+    # The planner and headways are derived on first use, not at attach time
+    assert "journey_planner" not in vars(attached) and "headways" not in vars(attached)
+    assert attached.journey_planner.plan("UN", "OS", attached.services(), 8 * 3600) is not None
+    assert "journey_planner" in vars(attached)
@@ -0,0 +1,64 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from conftest import DATA_DIR, DELAY_LOG_DIR, THURSDAY
+from go_api_simu import GoAPISimulator
+
+
+@pytest.fixture
+def feed_dir(tmp_path):
+    path = tmp_path / "gtfs"
+    shutil.copytree(DATA_DIR, path)
+    return path
+
+
+@pytest.fixture
+def simulator(feed_dir, tmp_path):
+    return GoAPISimulator(
+        data_dir=str(feed_dir), cache_dir=str(tmp_path / "cache"), delay_log_dir=DELAY_LOG_DIR,
+        start_date=THURSDAY, end_date=20180308,
+    )
+
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_reload_reuses_unchanged_partitions(simulator, feed_dir):
+    before = simulator.partition(THURSDAY, "LE")
+    assert simulator.reload() == {"changed": False, "fingerprint": simulator.feed.fingerprint}
+
+    touch(feed_dir / "stop_times.txt")
+    report = simulator.reload()
+
+    assert report["changed"] and report["reused"] == [(("LE",), THURSDAY)] and report["rebuilt"] == []
+    assert simulator.partition(THURSDAY, "LE") is before
+
+
+def test_reload_drops_partitions_of_removed_corridors(simulator, feed_dir):
+    simulator.partition(THURSDAY, "LE")
+    simulator.partition(THURSDAY, None)
+    old = simulator.feed
+
+    trips = pd.read_csv(feed_dir / "trips.txt", dtype=str)
+    lw_trips = trips[trips.route_id.str.endswith("-LW")].trip_id
+    trips[~trips.trip_id.isin(lw_trips)].to_csv(feed_dir / "trips.txt", index=False)
+    stop_times = pd.read_csv(feed_dir / "stop_times.txt", dtype=str)
+    stop_times[~stop_times.trip_id.isin(lw_trips)].to_csv(feed_dir / "stop_times.txt", index=False)
+
+    report = simulator.reload()
+
+    assert report["dropped"] == [(("LE", "LW"), THURSDAY)]
+    assert report["reused"] == [(("LE",), THURSDAY)]
+    assert simulator.feed is not old and simulator.feed.corridors == ("LE",)
+    assert [trip["trip_id"] for trip in simulator.get_next_available_trips("UN", "OS", time="07:00", date=THURSDAY)] \
+        == ["WKDY-LE-900", "WKDY-LE-902", "WKDY-LE-904"]
+
+    # The retired feed still answers, without writing snapshots under its old fingerprint
+    assert old.retired
+    old.partition(old.corridor_key("LE"), 20180305)
+    assert not [name for name in os.listdir(simulator.cache_dir) if old.fingerprint in name]
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+from conftest import DATA_DIR, THURSDAY
+from go_api_simu import ServiceCalendar
+
+
+def test_calendar_weekly_pattern_and_exceptions():
+    calendar = ServiceCalendar.from_feed(DATA_DIR)
+
+    assert calendar.services_on(THURSDAY) == ("WKDY",)
+    assert calendar.services_on(20180302) == ("HOL",)  # WKDY removed, HOL added
+    assert calendar.services_on(20180303) == ("WKND",)
+    assert calendar.services_on(20180305) == ("WKDY",)
+    assert 20180401 not in calendar
+    assert calendar.services_on(20180401) == ()
+
+
+def test_calendar_array_round_trip():
+    calendar = ServiceCalendar.from_feed(DATA_DIR)
+    restored = ServiceCalendar.from_arrays(calendar.to_arrays())
+
+    for date in calendar.dates.tolist():
+        assert restored.services_on(date) == calendar.services_on(date)
+
+
+def test_date_without_service_skips_stop_times(feed, monkeypatch):
+    read = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, "read_csv", lambda path, *args, **kwargs: read.append(os.path.basename(path)) or
+                        read_csv(path, *args, **kwargs))
+
+    partition = feed.partition(feed.corridor_key(None), 20180228)  # the day before the feed starts
+
+    assert "stop_times.txt" not in read
+    assert len(partition.services()) == 0 and len(partition.trips) == 0
+    assert partition.pair_index.next_departures("UN", "OS", 0) == []
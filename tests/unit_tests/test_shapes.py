@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo import path_length_km
+from shapes import ShapeIndex
+
+SHAPES = pd.DataFrame({
+    "shape_id": ["B", "A", "A", "B", "A", "A"],
+    "shape_pt_lat": [43.0, 43.2, 43.0, 43.1, 43.1, np.nan],
+    "shape_pt_lon": [-79.0, -79.2, -79.0, -79.1, -79.1, -79.3],
+    "shape_pt_sequence": [1, 3, 1, 2, 2, 4],
+})
+
+
+def test_csr_layout_and_cumulative_distances():
+    index = ShapeIndex(SHAPES)
+
+    assert index.shape_ids.tolist() == ["A", "B"] and len(index) == 2 and "B" in index
+    assert index.starts.tolist() == [0, 3] and index.ends.tolist() == [3, 5]
+    # Points follow shape_pt_sequence; the point without coordinates is dropped
+    assert index.points(0).tolist() == [[43.0, -79.0], [43.1, -79.1], [43.2, -79.2]]
+    assert index.points(0, 1, 2).tolist() == [[43.1, -79.1], [43.2, -79.2]]
+
+    assert index.distances[index.starts].tolist() == [0.0, 0.0]
+    for code in range(len(index)):
+        distances = index.distances[index.starts[code]:index.ends[code]]
+        assert np.all(np.diff(distances) > 0)
+        assert distances[-1] == pytest.approx(path_length_km(index.points(code)))
+
+
+def test_array_round_trip_and_missing_shapes_file(tmp_path):
+    index = ShapeIndex(SHAPES)
+    restored = ShapeIndex.from_arrays(index.to_arrays())
+    assert restored.codes_by_id == index.codes_by_id
+    assert restored.points(1).tolist() == index.points(1).tolist()
+
+    assert len(ShapeIndex.from_feed(str(tmp_path))) == 0
+
+
+def test_stop_offsets_snap_and_stay_monotonic():
+    index = ShapeIndex(SHAPES)
+    trip_shapes = np.array([0, -1], dtype=np.int32)
+    row_trip = np.array([0, 0, 0, 0, 1, 1])
+    stop_coords = np.array([
+        (43.0, -79.0), (43.21, -79.19),
+        (43.1, -79.1),   # snaps behind the previous stop, so it is held at offset 2
+        (43.2, -79.2),
+        (43.0, -79.0), (43.1, -79.1),   # trip without a shape
+    ])
+
+    assert index.stop_offsets(trip_shapes, row_trip, stop_coords).tolist() == [0, 2, 2, 2, -1, -1]
+
+
+def test_trip_shape_slices_between_stops(simulator):
+    shape = pd.read_csv(os.path.join(simulator.data_dir, "shapes.txt"))
+    le0 = [tuple(p) for p in shape[shape.shape_id == "LE0"][["shape_pt_lat", "shape_pt_lon"]].to_numpy().tolist()]
+
+    assert simulator.get_trip_shape("WKDY-LE-900", date=20180301) == le0
+    # Danforth is the third shape point and Pickering the sixth
+    assert simulator.get_trip_shape("WKDY-LE-900", "DA", "PIN", date=20180301) == le0[2:6]
+    # The express skips Danforth and Scarborough but still follows the track
+    assert simulator.get_trip_shape("WKDY-LE-904", "UN", "PIN", date=20180301) == le0[:6]
+    with pytest.raises(ValueError, match="does not run"):
+        simulator.get_trip_shape("WKDY-LE-900", "PIN", "DA", date=20180301)
@@ -0,0 +1,74 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from conftest import DATA_DIR
+from go_api_simu import GtfsFeed
+from snapshots import load_snapshot, save_matrix, save_snapshot
+
+
+def test_snapshot_round_trip_with_mmap(tmp_path):
+    frame = pd.DataFrame({
+        "stop_id": pd.Categorical(["UN", "DA", "UN"]),
+        "name": ["Union", None, "Union"],
+        "seconds": np.array([25200, 25620, 90000], dtype=np.int32),
+        "when": pd.to_datetime(["2018-03-01 07:00", "2018-03-01 07:07", "2018-03-02 01:00"]),
+    })
+    path = str(tmp_path / "frames_0123.npz")
+    save_snapshot(path, {"frame": frame}, {"digest": np.array("abc"), "rows": np.arange(5, dtype=np.int64)})
+
+    frames, arrays = load_snapshot(path, mmap=True)
+    restored = frames["frame"]
+    assert list(restored.columns) == list(frame.columns)
+    assert isinstance(restored.stop_id.dtype, pd.CategoricalDtype)
+    assert restored.stop_id.tolist() == ["UN", "DA", "UN"]
+    assert restored.name.tolist() == ["Union", None, "Union"]
+    assert restored.seconds.dtype == np.int32 and restored.seconds.tolist() == [25200, 25620, 90000]
+    assert restored.when.tolist() == frame.when.tolist()
+    assert isinstance(arrays["rows"].base, np.memmap)  # mapped from the file, not copied
+    assert arrays["rows"].tolist() == [0, 1, 2, 3, 4]
+    assert str(arrays["digest"]) == "abc"
+
+
+def run_threads(target, n=8):
+    errors = []
+    barrier = threading.Barrier(n)
+
+    def run(i):
+        barrier.wait()
+        try:
+            target(i)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_concurrent_writes_to_one_path(tmp_path):
+    snapshot = str(tmp_path / "frames_0123.npz")
+    matrix = str(tmp_path / "matrix_0123.npy")
+
+    def write(i):
+        save_snapshot(snapshot, {"frame": pd.DataFrame({"i": [i] * 100})})
+        save_matrix(matrix, np.full((10, 3), i, dtype=np.float32))
+
+    assert run_threads(write) == []
+    assert sorted(os.listdir(tmp_path)) == ["frames_0123.npz", "matrix_0123.npy"]  # no temp files left behind
+    assert load_snapshot(snapshot)[0]["frame"].i.nunique() == 1
+
+
+def test_concurrent_partition_loads_build_once(tmp_path):
+    feed = GtfsFeed(DATA_DIR, str(tmp_path), use_snapshot=True)
+    key = feed.corridor_key(None)
+    found = []
+
+    assert run_threads(lambda i: found.append(feed.partition(key, 20180305))) == []
+    assert len(found) == 8 and all(partition is found[0] for partition in found)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,49 @@
+import itertools
+import os
+
+import pandas as pd
+
+from conftest import DATA_DIR
+from go_api_simu import gtfs_time_to_seconds
+
+
+def brute_force_departures(o_stop_id, d_stop_id, after, service_ids):
+    """Trips of `service_ids` leaving o_stop_id at or after `after` and later reaching d_stop_id."""
+    trips = pd.read_csv(os.path.join(DATA_DIR, "trips.txt"), dtype=str)
+    stop_times = pd.read_csv(os.path.join(DATA_DIR, "stop_times.txt"), dtype={"stop_id": str})
+    stop_times = stop_times[stop_times.trip_id.isin(trips[trips.service_id.isin(service_ids)].trip_id)]
+
+    found = []
+    for trip_id, rows in stop_times.groupby("trip_id"):
+        o = rows[rows.stop_id == o_stop_id]
+        d = rows[rows.stop_id == d_stop_id]
+        if o.empty or d.empty or o.stop_sequence.iloc[0] >= d.stop_sequence.iloc[0]:
+            continue
+        departure = gtfs_time_to_seconds(o.departure_time.iloc[0])
+        if departure >= after:
+            found.append((departure, trip_id))
+    return sorted(found)
+
+
+def test_next_departures_matches_brute_force(partition):
+    stop_ids = partition.trip_index.stop_ids.tolist()
+    idx = partition.trip_index
+
+    for o_stop_id, d_stop_id in itertools.permutations(stop_ids, 2):
+        for after in (0, 7 * 3600, 8 * 3600 + 60, 24 * 3600):
+            expected = brute_force_departures(o_stop_id, d_stop_id, after, ["WKDY"])
+            found = partition.pair_index.next_departures(o_stop_id, d_stop_id, after, n=10)
+
+            assert [(departure, idx.trip_id_of(o_row)) for departure, o_row, _ in found] == expected
+            for _, o_row, d_row in found:
+                assert idx.stop_id_of(o_row) == o_stop_id
+                assert idx.stop_id_of(d_row) == d_stop_id
+                assert idx.row_trip[o_row] == idx.row_trip[d_row] and o_row < d_row
+
+
+def test_next_departures_offset_into_previous_service_day(partition):
+    # 00:30 on the next calendar day is 24:30 of this service day
+    found = partition.pair_index.next_departures("UN", "PIN", 0, offset=86400)
+    assert [(departure, partition.trip_index.trip_id_of(o_row)) for departure, o_row, _ in found] == [
+        (1800, "WKDY-LE-906")
+    ]
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from stop_resolver import StopNameResolver, normalize_stop_name
+
+STOPS = pd.DataFrame({
+    "stop_id": ["UN", "PIN", "SC", "OS", "OSB", "EX"],
+    "stop_name": [
+        "Union Station", "Pickering GO", "Scarborough GO", "Oshawa GO", "Oshawa Bus Terminal", "Exhibition GO",
+    ],
+})
+
+
+@pytest.fixture
+def resolver():
+    return StopNameResolver(STOPS)
+
+
+def test_normalize_stop_name():
+    assert normalize_stop_name("  Union-Station, GO ") == "union station go"
+
+
+def test_exact_and_core_name_tier(resolver):
+    assert resolver.resolve("UNION station")["stop_id"] == "UN"
+    result = resolver.resolve("Pickering GO Station")  # generic words dropped
+    assert (result["stop_id"], result["tier"], result["score"]) == ("PIN", "exact", 1.0)
+    # "oshawa" is the core of two stops, so it is not an exact alias
+    assert "oshawa" not in resolver.exact
+
+
+def test_fuzzy_tier(resolver):
+    result = resolver.resolve("Scarborugh")
+    assert (result["stop_id"], result["tier"]) == ("SC", "fuzzy")
+    assert resolver.min_fuzzy_score <= result["score"] < 1.0
+
+
+def test_embedding_tier_only_below_fuzzy_threshold(resolver):
+    calls = []
+
+    def embedding_search(names):
+        calls.append(names)
+        return [{"stop_id": "EX", "stop_name": "Exhibition GO", "score": 0.8} for _ in names]
+
+    results = resolver.resolve_many(["Union", "the CNE grounds", "the Ex"], embedding_search)
+
+    assert [r["tier"] for r in results] == ["exact", "embedding", "embedding"]
+    assert calls == [["the CNE grounds", "the Ex"]]  # one batched call for every miss
+
+
+def test_without_embedding_search(resolver):
+    # The weak fuzzy match is accepted when there is no better tier to ask
+    assert resolver.resolve("the Ex")["stop_id"] == "EX"
+    with pytest.raises(ValueError, match="Stop not found"):
+        resolver.resolve("zzz")
@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 from langchain_core.tools import tool
 import requests
 import re
+import threading
 import folium
 from folium.plugins import AntPath
 import polyline
@@ -18,14 +19,27 @@ from langchain.output_parsers.structured import ResponseSchema, StructuredOutput
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
 from langchain_openai import ChatOpenAI
 
-from go_api_simu import GoAPISimulator
+from go_api_simu import GoAPISimulator, parse_time_of_day
+from geo import path_length_km
 from go_api import GoTrainAPI
 load_dotenv()
 
 gmaps = googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
 
 # go_api_simulator = GoAPISimulator()  # Before using it, you need to download the data from the GO Transit API and save it to the Data folder
-go_api_simulator = GoTrainAPI()
+GO_API_BASE_URL = os.getenv("GO_API_BASE_URL", "http://api.openmetrolinx.com/OpenDataAPI/")  # point at go_api_server.py to run offline
+go_api_simulator = GoTrainAPI(base_url=GO_API_BASE_URL)
+local_simulator = None
+_local_simulator_lock = threading.Lock()
+
+def get_local_simulator() -> GoAPISimulator:
+    """Return the shared GTFS simulator, loading it on first use (requires the Data folder)."""
+    global local_simulator
+    if local_simulator is None:
+        with _local_simulator_lock:
+            if local_simulator is None:
+                local_simulator = GoAPISimulator()
+    return local_simulator
 
 # ==================================== Helper Functions ====================================
 def clean_html(raw_html):
@@ -67,6 +81,38 @@ def format_trip_text(trip):
 
     return "\n".join(lines)
 
+def journey_to_directions(journey):
+    """Convert a `GoAPISimulator.plan_journey` result into the Google Directions trip layout."""
+    def duration_text(start, end):
+        minutes = (parse_time_of_day(end) - parse_time_of_day(start)) // 60
+        return f"{minutes // 60} hours {minutes % 60} mins" if minutes >= 60 else f"{minutes} mins"
+
+    steps = []
+    for leg in journey['legs']:
+        path = leg['path']
+        steps.append({
+            'html_instructions': f"Train {leg['trip_id']} from {leg['origin']} ({leg['departure_time']}) "
+                                 f"to {leg['destination']} ({leg['arrival_time']}), {leg['num_stops']} stops",
+            'travel_mode': 'TRANSIT',
+            'transit_details': {'line': {'agencies': [{'name': 'GO Transit'}], 'vehicle': {'color': 'green'}}},
+            'distance': {'text': f"{path_length_km(path):.1f} km"},
+            'duration': {'text': duration_text(leg['departure_time'], leg['arrival_time'])},
+            'start_location': {'lat': path[0][0], 'lng': path[0][1]},
+            'end_location': {'lat': path[-1][0], 'lng': path[-1][1]},
+            'polyline': {'points': polyline.encode(path)},
+        })
+
+    return {
+        'warnings': [],
+        'legs': [{
+            'distance': {'text': f"{sum(path_length_km(leg['path']) for leg in journey['legs']):.1f} km"},
+            'duration': {'text': duration_text(journey['departure_time'], journey['arrival_time'])},
+            'start_address': journey['origin'],
+            'end_address': journey['destination'],
+            'steps': steps,
+        }],
+    }
+
 def plot_trip(trip):
     """Plot the trip on a map."""
     m = folium.Map(location=[43.65107, -79.347015], zoom_start=12)
@@ -104,9 +150,9 @@ def plot_trip(trip):
                 icon=folium.Icon(color='gray')
             ).add_to(m)
 
-            # save the map
-            m.save(m_name)
-
+    # save the map, also when the trip has no steps (e.g. origin and destination match)
+    os.makedirs(os.path.dirname(m_name), exist_ok=True)
+    m.save(m_name)
     return m_name
 
 # ==================================== Vector Database ====================================
@@ -158,7 +204,8 @@ def get_route(
     destination: str,
     mode: str,
     departure_time: datetime = datetime.now(),
-    bounds: list[float] = None
+    bounds: list[float] = None,
+    backend: str = "google"
 ) -> tuple[list[str], list[folium.Map]]:
     """
     Plan a public transit route between two places.
@@ -169,7 +216,17 @@ def get_route(
     2. A list of folium maps visualizing each trip on a map.
 
     Mode can be set to 'transit', 'walking', or other Google Maps-supported modes.
+    Set backend to 'gtfs' to plan GO-to-GO trips offline with the local GTFS
+    journey planner instead of Google Maps.
     """
+    if backend == "gtfs":
+        simulator = get_local_simulator()
+        o_stop_id, d_stop_id = simulator.get_stop_ids([origin, destination], method="resolve")
+        # The simulator serves a fixed GTFS window, so only the time of day is used
+        journey = simulator.plan_journey(o_stop_id, d_stop_id, time=departure_time.time())
+        trips = [journey_to_directions(journey)]
+        return [format_trip_text(trip) for trip in trips], [plot_trip(trip) for trip in trips]
+
     if bounds:
         origin_result = gmaps.geocode(origin, region="CA", bounds=bounds)[0]['geometry']
         dest_result = gmaps.geocode(destination, region="CA", bounds=bounds)[0]['geometry']
@@ -230,7 +287,7 @@ def get_all_go_transit_alert() -> str:
     This includes service disruptions, delays, station closures, and other relevant alerts
     affecting the GO Transit system. Data is retrieved from Metrolinx’s GTFS-RT Alert feed.
     """
-    base_url = "http://api.openmetrolinx.com/OpenDataAPI/"
+    base_url = GO_API_BASE_URL
     api_key = os.getenv("GO_TRANSIT_API_KEY")
     endpoint = "api/V1/Fleet/Occupancy/GtfsRT/Feed/Alerts"
     url = f"{base_url}{endpoint}?key={api_key}"
@@ -250,7 +307,7 @@ def get_go_transit_trip_updates() -> str:
     Returns live vehicle arrival/departure times, delays, and other GTFS-reported
     trip-level information across the network.
     """
-    base_url = "http://api.openmetrolinx.com/OpenDataAPI/"
+    base_url = GO_API_BASE_URL
     api_key = os.getenv("GO_TRANSIT_API_KEY")
     endpoint = "api/V1/Fleet/Occupancy/GtfsRT/Feed/TripUpdates"
     url = f"{base_url}{endpoint}?key={api_key}"
@@ -262,6 +319,32 @@ def get_go_transit_trip_updates() -> str:
     else:
         return f"Error: {response.status_code}"
     
+@tool
+def get_service_frequency(line: str, station: str = None, time_band: str = None) -> list:
+    """
+    Tell how often a GO Transit train line runs, from the local GTFS schedule.
+
+    Use this for questions like "how often does the Lakeshore East train run at rush hour".
+    No external API is called.
+
+    Parameters:
+        line (str): Line name or code (e.g., "Lakeshore East" or "LE").
+        station (str, optional): Station name; omit for line-level frequency.
+        time_band (str, optional): One of "early", "am_peak", "midday", "pm_peak",
+                                   "evening" or "night"; omit for all bands.
+
+    Returns:
+        list: One entry per direction and time band with the number of departures,
+              first/last departure and median/min/max minutes between trains,
+              or a single {"error": ...} entry naming the valid lines.
+    """
+    simulator = get_local_simulator()
+    try:
+        stop_id = simulator.get_stop_ids([station], method="resolve")[0] if station else None
+        return simulator.get_headways(line, stop_id=stop_id, band=time_band)
+    except ValueError as e:
+        return [{"error": f"Service frequency lookup failed: {e}"}]
+
 @tool
 def get_current_time() -> str:
     """
@@ -278,7 +361,7 @@ def trip_id_to_trip_od_info(trip_update_text: str) -> str:
     """
     Convert a Trip ID found in service update text into origin/destination trip info.
 
-    This tool extracts a numeric Trip ID from the input text, queries the GO Transit API,
+    This tool extracts a numeric Trip ID from the input text, looks it up in the local GTFS schedule,
     and returns the corresponding origin station, origin time, destination station, and destination time
     in the format: "<Origin Station> <Departure Time> - <Destination Station> <Arrival Time>".
 
@@ -290,7 +373,7 @@ def trip_id_to_trip_od_info(trip_update_text: str) -> str:
     """
     try:
         trip_id = re.findall(r'\d+', trip_update_text)[0]
-        s_h = go_api_simulator.get_trip_info(trip_id)['stop_headsign']
+        s_h = get_local_simulator().get_trip_info(trip_id)['stop_headsign']
         match = re.match(r'(.+)\s+(\d{2}:\d{2})\s+-\s+(.+)\s+(\d{2}:\d{2})', s_h)
 
         if match:
@@ -315,7 +398,7 @@ def next_available_trip(user_request: str) -> dict:
                             (e.g., "What's the next train from Union to Oakville?").
 
     Returns:
-        dict: Next available trip info (from GO API) or an error message.
+        dict: Next available trip info (from the local GTFS schedule) or an error message.
     """
     # Define output schema
     trip_schema = {
@@ -348,10 +431,10 @@ def next_available_trip(user_request: str) -> dict:
         if not origin or not destination:
             return {"error": "Missing origin or destination in user request."}
 
-        # Get stop IDs from API
-        o_stop_id = go_api_simulator.get_stop_id(origin, method="embedding_search")
-        d_stop_id = go_api_simulator.get_stop_id(destination, method="embedding_search")
+        # Resolve both names in one batch on the local simulator
+        simulator = get_local_simulator()
+        o_stop_id, d_stop_id = simulator.get_stop_ids([origin, destination], method="resolve")
 
-        return go_api_simulator.get_next_available_trip(o_stop_id, d_stop_id)
+        return simulator.get_next_available_trip(o_stop_id, d_stop_id)
     except Exception as e:
         return {"error": f"Next trip lookup failed: {e}"}